@@ -0,0 +1,33 @@
+"""add booking snapshot_updated_at and departure_at
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9d7b10"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "booking",
+        sa.Column("snapshot_updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column("booking", sa.Column("departure_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("booking", "departure_at")
+    op.drop_column("booking", "snapshot_updated_at")
@@ -0,0 +1,59 @@
+"""add booking indexes
+
+Revision ID: 8a4e6b2c5d31
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-17 10:00:00.000000
+
+flight_order_id becomes unique. Rows that repeat an order id (the same
+Amadeus order stored twice by racing requests) may differ in status and are
+referenced by payments, so they are not merged automatically: the upgrade
+stops and lists them, to be resolved by hand before running it again.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8a4e6b2c5d31"
+down_revision: Union[str, Sequence[str], None] = "3f1c2a9d7b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_booking_user_id_created_at", "booking", ["user_id", "created_at"]
+    )
+    op.create_index("ix_booking_status", "booking", ["status"])
+    duplicates = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT flight_order_id, COUNT(*) FROM booking "
+                "GROUP BY flight_order_id HAVING COUNT(*) > 1"
+            )
+        )
+        .all()
+    )
+    if duplicates:
+        listed = ", ".join(
+            f"{order_id} ({count} rows)" for order_id, count in duplicates
+        )
+        raise RuntimeError(
+            "Bookings share a flight_order_id, keep one booking per order before "
+            f"upgrading: {listed}"
+        )
+    op.create_index(
+        "ix_booking_flight_order_id", "booking", ["flight_order_id"], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_booking_flight_order_id", table_name="booking")
+    op.drop_index("ix_booking_status", table_name="booking")
+    op.drop_index("ix_booking_user_id_created_at", table_name="booking")
@@ -0,0 +1,39 @@
+"""add userindb reset_token_selector
+
+Revision ID: c7d9e1f3a5b2
+Revises: 8a4e6b2c5d31
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7d9e1f3a5b2"
+down_revision: Union[str, Sequence[str], None] = "8a4e6b2c5d31"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tokens already issued keep a NULL selector and are checked the old way
+    # until they expire
+    op.add_column(
+        "userindb", sa.Column("reset_token_selector", sa.String(), nullable=True)
+    )
+    op.create_index(
+        "ix_userindb_reset_token_selector",
+        "userindb",
+        ["reset_token_selector"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_userindb_reset_token_selector", table_name="userindb")
+    op.drop_column("userindb", "reset_token_selector")
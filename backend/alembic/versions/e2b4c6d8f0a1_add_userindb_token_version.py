@@ -0,0 +1,33 @@
+"""add userindb token_version
+
+Revision ID: e2b4c6d8f0a1
+Revises: c7d9e1f3a5b2
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b4c6d8f0a1"
+down_revision: Union[str, Sequence[str], None] = "c7d9e1f3a5b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "userindb",
+        sa.Column(
+            "token_version", sa.Integer(), nullable=False, server_default=sa.text("0")
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("userindb", "token_version")
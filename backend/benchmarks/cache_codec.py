@@ -0,0 +1,136 @@
+"""
+Benchmark: bytes stored and encode/decode time per cache codec.
+
+Uses a synthetic 250-offer Amadeus flight-offers search response shaped like
+the real payload (itineraries, segments, pricing, traveler pricings), which is
+what dominates Redis memory for flight searches.
+
+Run from the backend folder:
+
+    python benchmarks/cache_codec.py --offers 250 --rounds 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("AMADEUS_API_KEY", "benchmark")
+os.environ.setdefault("AMADEUS_API_SECRET", "benchmark")
+
+from external_services.cache import CacheCodec, msgpack, orjson, zstandard  # noqa: E402
+
+CARRIERS = ["KQ", "BA", "EK", "QR", "ET", "TK", "KL", "AF"]
+AIRPORTS = ["NBO", "LHR", "DXB", "DOH", "ADD", "IST", "AMS", "CDG"]
+
+
+def segment(rng: random.Random, number: int) -> dict:
+    carrier = rng.choice(CARRIERS)
+    return {
+        "departure": {
+            "iataCode": rng.choice(AIRPORTS),
+            "terminal": str(rng.randint(1, 5)),
+            "at": f"2026-12-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:15:00",
+        },
+        "arrival": {
+            "iataCode": rng.choice(AIRPORTS),
+            "at": f"2026-12-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:40:00",
+        },
+        "carrierCode": carrier,
+        "number": str(rng.randint(100, 9999)),
+        "aircraft": {"code": rng.choice(["788", "77W", "359", "320"])},
+        "operating": {"carrierCode": carrier},
+        "duration": f"PT{rng.randint(1, 12)}H{rng.randint(0, 59)}M",
+        "id": str(number),
+        "numberOfStops": 0,
+        "blacklistedInEU": False,
+    }
+
+
+def flight_offer(rng: random.Random, offer_id: int) -> dict:
+    segments = [segment(rng, offer_id * 10 + i) for i in range(rng.randint(1, 3))]
+    total = f"{rng.uniform(300, 2500):.2f}"
+    return {
+        "type": "flight-offer",
+        "id": str(offer_id),
+        "source": "GDS",
+        "instantTicketingRequired": False,
+        "nonHomogeneous": False,
+        "oneWay": False,
+        "lastTicketingDate": "2026-11-20",
+        "numberOfBookableSeats": rng.randint(1, 9),
+        "itineraries": [{"duration": "PT14H30M", "segments": segments}],
+        "price": {
+            "currency": "USD",
+            "total": total,
+            "base": f"{float(total) * 0.8:.2f}",
+            "fees": [{"amount": "0.00", "type": "SUPPLIER"}],
+            "grandTotal": total,
+        },
+        "pricingOptions": {"fareType": ["PUBLISHED"], "includedCheckedBagsOnly": True},
+        "validatingAirlineCodes": [segments[0]["carrierCode"]],
+        "travelerPricings": [
+            {
+                "travelerId": "1",
+                "fareOption": "STANDARD",
+                "travelerType": "ADULT",
+                "price": {"currency": "USD", "total": total, "base": total},
+                "fareDetailsBySegment": [
+                    {
+                        "segmentId": s["id"],
+                        "cabin": "ECONOMY",
+                        "fareBasis": "KLOWKE",
+                        "class": "K",
+                        "includedCheckedBags": {"weight": 23, "weightUnit": "KG"},
+                    }
+                    for s in segments
+                ],
+            }
+        ],
+    }
+
+
+def codecs() -> dict[str, CacheCodec]:
+    candidates = {"json": CacheCodec("json", None, compress_threshold=1 << 62)}
+    if orjson:
+        candidates["orjson"] = CacheCodec("orjson", None, compress_threshold=1 << 62)
+    candidates["json+zlib"] = CacheCodec("json", "zlib", compress_threshold=0)
+    if orjson and zstandard:
+        candidates["orjson+zstd"] = CacheCodec("orjson", "zstd", compress_threshold=0)
+    if msgpack:
+        candidates["msgpack"] = CacheCodec("msgpack", None, compress_threshold=1 << 62)
+        if zstandard:
+            candidates["msgpack+zstd"] = CacheCodec(
+                "msgpack", "zstd", compress_threshold=0
+            )
+    return candidates
+
+
+def main(args):
+    rng = random.Random(42)
+    payload = [flight_offer(rng, i) for i in range(args.offers)]
+
+    print(f"{'codec':>14} {'bytes':>10} {'encode ms':>10} {'decode ms':>10}")
+    for name, codec in codecs().items():
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            data = codec.encode(payload)
+        encode_ms = (time.perf_counter() - started) / args.rounds * 1000
+
+        assert codec.decode(data) == payload
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            codec.decode(data)
+        decode_ms = (time.perf_counter() - started) / args.rounds * 1000
+
+        print(f"{name:>14} {len(data):>10} {encode_ms:>10.2f} {decode_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--offers", type=int, default=250)
+    parser.add_argument("--rounds", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,82 @@
+"""
+Benchmark: sequential vs bounded concurrent retrieval of flight orders.
+
+Amadeus is replaced by a stub that answers each order lookup after a fixed
+latency (one order id is unknown and returns 404) so the run also shows
+partial failures coming back as per-order error entries. The service's rate
+limiter is lifted; in production it caps the fan-out at AMADEUS_RATE_LIMIT
+calls per second (100 orders take at least about 9 s at the default 10/s).
+
+Run from the backend folder:
+
+    python benchmarks/fetch_orders.py --orders 100 --concurrency 10 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("AMADEUS_API_KEY", "benchmark")
+os.environ.setdefault("AMADEUS_API_SECRET", "benchmark")
+
+import httpx  # noqa: E402
+
+from external_services.flight import AsyncAmadeusFlightService  # noqa: E402
+from external_services.resilience import AdaptiveRateLimiter  # noqa: E402
+
+MISSING_ORDER_ID = "missing"
+
+
+def stub_service(latency: float) -> AsyncAmadeusFlightService:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/oauth2/token"):
+            return httpx.Response(200, json={"access_token": "t", "expires_in": 1799})
+        await asyncio.sleep(latency)
+        order_id = request.url.path.rsplit("/", 1)[-1]
+        if order_id == MISSING_ORDER_ID:
+            return httpx.Response(404, json={"errors": [{"status": 404}]})
+        return httpx.Response(
+            200, json={"data": {"type": "flight-order", "id": order_id}}
+        )
+
+    client = httpx.AsyncClient(
+        base_url="https://amadeus.test", transport=httpx.MockTransport(handler)
+    )
+    # Unrestricted, the default Amadeus rate limit would dominate the timings
+    return AsyncAmadeusFlightService(
+        client=client, rate_limiter=AdaptiveRateLimiter(1e6, burst=10**6)
+    )
+
+
+async def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    service = stub_service(args.latency)
+    order_ids = [f"order-{i}" for i in range(args.orders - 1)] + [MISSING_ORDER_ID]
+
+    # Warm up the access token outside the measurement
+    await service.get_flight_orders(order_ids[:1])
+
+    for name, concurrency in (("sequential", 1), ("concurrent", args.concurrency)):
+        started = time.perf_counter()
+        orders = await service.get_flight_orders(order_ids, concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+        errors = sum(1 for order in orders if "error" in order)
+        print(
+            f"{name:>10}: {len(orders)} orders in {elapsed:.2f}s "
+            f"({errors} returned as error entries)"
+        )
+
+    await service.client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""
+Load test: concurrent flight search throughput, blocking SDK vs async client.
+
+Amadeus is replaced by a stub that answers after a fixed latency, so the
+numbers only reflect how the API process schedules upstream calls:
+
+* before - the synchronous ``AmadeusFlightService`` called from an async
+  handler, exactly like the routers used to do (the SDK call blocks the loop)
+* after  - ``AsyncAmadeusFlightService`` on a pooled ``httpx.AsyncClient``
+
+Run from the backend folder:
+
+    python benchmarks/load_search.py --requests 200 --concurrency 50 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("AMADEUS_API_KEY", "benchmark")
+os.environ.setdefault("AMADEUS_API_SECRET", "benchmark")
+
+import httpx  # noqa: E402
+
+from external_services.flight import (  # noqa: E402
+    AmadeusFlightService,
+    AsyncAmadeusFlightService,
+)
+from external_services.resilience import AdaptiveRateLimiter  # noqa: E402
+
+SEARCH_PARAMS = {
+    "originLocationCode": "NBO",
+    "destinationLocationCode": "LHR",
+    "departureDate": "2026-12-01",
+    "adults": 1,
+    "max": 5,
+}
+OFFERS = [{"type": "flight-offer", "id": str(i)} for i in range(5)]
+
+
+def blocking_service(latency: float) -> AmadeusFlightService:
+    service = AmadeusFlightService()
+
+    def get(**params):
+        time.sleep(latency)
+        return SimpleNamespace(data=OFFERS)
+
+    service.amadeus.shopping.flight_offers_search.get = get
+    return service
+
+
+def async_service(latency: float, max_connections: int) -> AsyncAmadeusFlightService:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/oauth2/token"):
+            return httpx.Response(200, json={"access_token": "t", "expires_in": 1799})
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={"data": OFFERS})
+
+    client = httpx.AsyncClient(
+        base_url="https://amadeus.test",
+        transport=httpx.MockTransport(handler),
+        limits=httpx.Limits(max_connections=max_connections),
+    )
+    # Unrestricted, the default Amadeus rate limit would dominate the timings
+    return AsyncAmadeusFlightService(
+        client=client, rate_limiter=AdaptiveRateLimiter(1e6, burst=10**6)
+    )
+
+
+async def run(search, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await search(SEARCH_PARAMS)
+
+    # Warm up connections and the access token outside the measurement
+    await search(SEARCH_PARAMS)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    sync_service = blocking_service(args.latency)
+
+    async def before(params):
+        # What the handlers did before: a blocking SDK call on the event loop
+        return sync_service.search_flights_get(params)
+
+    after_service = async_service(args.latency, args.concurrency)
+
+    for name, search in (
+        ("before", before),
+        ("after", after_service.search_flights_get),
+    ):
+        elapsed = await run(search, args.requests, args.concurrency)
+        print(
+            f"{name:>6}: {args.requests} searches in {elapsed:.2f}s "
+            f"-> {args.requests / elapsed:.1f} req/s"
+        )
+
+    await after_service.client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+Benchmark: login throughput and event-loop latency during a login burst.
+
+Each simulated login is the bcrypt check ``/token`` performs, run either:
+
+* before - inline in the coroutine, like ``verify_password`` used to do
+* after  - on the bounded ``PasswordHasher`` thread pool
+
+While the burst runs, a probe coroutine asks to wake up every 10 ms and
+records how late it was, which is the delay every other request on the
+worker would see.
+
+Run from the backend folder:
+
+    python benchmarks/login_throughput.py --logins 64 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from utils.security import PasswordHasher, pwd_context  # noqa: E402
+
+PROBE_INTERVAL = 0.01
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def run(login, total: int) -> tuple[float, list[float]]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    return elapsed, lags
+
+
+async def main(args):
+    password = "correct horse battery staple"
+    hashed = pwd_context.hash(password)
+    hasher = PasswordHasher(args.workers, max_pending=args.logins)
+
+    async def before():
+        pwd_context.verify(password, hashed)
+
+    async def after():
+        await hasher.run(pwd_context.verify, password, hashed)
+
+    print(f"{'':>6} {'logins/s':>9} {'loop lag p50':>13} {'p99':>8} {'max':>8}")
+    for name, login in (("before", before), ("after", after)):
+        elapsed, lags = await run(login, args.logins)
+        lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+        p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+        print(
+            f"{name:>6} {args.logins / elapsed:>9.1f} "
+            f"{statistics.median(lags_ms):>10.1f} ms {p99:>5.1f} ms "
+            f"{lags_ms[-1]:>5.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
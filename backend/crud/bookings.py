@@ -0,0 +1,220 @@
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import and_, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.bookings import Booking, BookingStatus
+
+
+def order_total_price(flight_order: dict) -> float:
+    """Sum the grand totals of the flight offers in an Amadeus flight order."""
+    total = 0.0
+    for offer in flight_order.get("flightOffers", []):
+        price = offer.get("price", {})
+        total += float(price.get("grandTotal") or price.get("total") or 0)
+    return total
+
+
+def order_last_departure(flight_order: dict) -> datetime | None:
+    """
+    Departure of the last flight in an Amadeus flight order, in local time at
+    its airport (Amadeus gives no UTC offset).
+    """
+    departures = [
+        segment["departure"]["at"]
+        for offer in flight_order.get("flightOffers", [])
+        for itinerary in offer.get("itineraries", [])
+        for segment in itinerary.get("segments", [])
+        if segment.get("departure", {}).get("at")
+    ]
+    try:
+        return max(datetime.fromisoformat(at).replace(tzinfo=None) for at in departures)
+    except ValueError:
+        # No departures, or one Amadeus wrote in another format
+        return None
+
+
+async def create_booking(
+    session: AsyncSession, user_id: uuid.UUID, flight_order: dict
+) -> Booking:
+    """Save a booking together with a snapshot of its Amadeus flight order."""
+    booking = Booking(
+        user_id=user_id,
+        flight_order_id=flight_order["id"],
+        total_price=order_total_price(flight_order),
+        amadeus_order_response=flight_order,
+        snapshot_updated_at=datetime.now(timezone.utc),
+        departure_at=order_last_departure(flight_order),
+    )
+    session.add(booking)
+    await session.commit()
+    await session.refresh(booking)
+    return booking
+
+
+def encode_booking_cursor(booking: Booking) -> str:
+    """Opaque keyset cursor pointing just after ``booking``."""
+    position = {"created_at": booking.created_at.isoformat(), "id": str(booking.id)}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_booking_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Raises ValueError when the cursor was not produced by this API."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position["created_at"]), uuid.UUID(position["id"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def list_user_bookings(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    limit: int,
+    cursor: str | None = None,
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> tuple[list[Booking], str | None]:
+    """
+    Return one page of the user's bookings, oldest first, and the cursor of
+    the next page (None on the last page).
+
+    Pages are read by keyset on ``(created_at, id)`` through the
+    ``(user_id, created_at)`` index, so every page costs the same however many
+    bookings the user has. Cancelled bookings are left out unless ``status``
+    asks for them.
+    """
+    query = select(Booking).where(Booking.user_id == user_id)
+    if status is None:
+        query = query.where(Booking.status != BookingStatus.CANCELLED)
+    else:
+        query = query.where(Booking.status == status)
+    if created_from is not None:
+        query = query.where(Booking.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Booking.created_at < created_to)
+    if cursor is not None:
+        created_at, booking_id = decode_booking_cursor(cursor)
+        query = query.where(
+            or_(
+                Booking.created_at > created_at,
+                and_(Booking.created_at == created_at, Booking.id > booking_id),
+            )
+        )
+
+    # One extra row tells whether there is a next page
+    bookings = (
+        await session.exec(
+            query.order_by(Booking.created_at, Booking.id).limit(limit + 1)
+        )
+    ).all()
+    if len(bookings) <= limit:
+        return bookings, None
+    return bookings[:limit], encode_booking_cursor(bookings[limit - 1])
+
+
+async def get_booking_by_id(
+    session: AsyncSession, booking_id: uuid.UUID | str
+) -> Booking | None:
+    return await session.get(Booking, uuid.UUID(str(booking_id)))
+
+
+async def get_booking_by_order_id(
+    session: AsyncSession, flight_order_id: str, user_id: uuid.UUID | None = None
+) -> Booking | None:
+    query = select(Booking).where(Booking.flight_order_id == flight_order_id)
+    if user_id is not None:
+        query = query.where(Booking.user_id == user_id)
+    return (await session.exec(query)).first()
+
+
+async def get_stale_bookings(
+    session: AsyncSession, max_age: timedelta, limit: int
+) -> list[Booking]:
+    """
+    Return up to ``limit`` active, upcoming bookings whose snapshot is older
+    than ``max_age`` (or missing), least recently synced first. Bookings whose
+    last flight has departed, or whose departure is still unknown after a
+    sync, are left out.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - max_age
+    # Departures are in local airport time, a day of slack covers any offset
+    departed_before = now.replace(tzinfo=None) - timedelta(days=1)
+    query = (
+        select(Booking)
+        .where(Booking.status != BookingStatus.CANCELLED)
+        .where(
+            or_(
+                Booking.departure_at >= departed_before,
+                Booking.snapshot_updated_at.is_(None),
+            )
+        )
+        .where(
+            or_(
+                Booking.snapshot_updated_at.is_(None),
+                Booking.snapshot_updated_at < cutoff,
+            )
+        )
+        .order_by(Booking.snapshot_updated_at.nulls_first())
+        .limit(limit)
+    )
+    return (await session.exec(query)).all()
+
+
+def update_booking_snapshot(
+    session: AsyncSession, booking: Booking, flight_order: dict
+):
+    """Replace the booking's order snapshot, without committing."""
+    booking.amadeus_order_response = flight_order
+    booking.total_price = order_total_price(flight_order)
+    booking.snapshot_updated_at = datetime.now(timezone.utc)
+    booking.departure_at = order_last_departure(flight_order)
+    session.add(booking)
+
+
+def mark_booking_snapshot_missing(session: AsyncSession, booking: Booking):
+    """
+    Record that Amadeus no longer returns the booking's order, without
+    committing. Its status and last snapshot are kept: a missing order does
+    not say whether the booking was cancelled, paid or refunded.
+    """
+    booking.snapshot_updated_at = datetime.now(timezone.utc)
+    session.add(booking)
+
+
+async def save_booking_snapshots(
+    session: AsyncSession, snapshots: dict[uuid.UUID, dict]
+):
+    """
+    Store fresh flight order snapshots by booking id and commit. The bookings
+    are loaded through ``session``, so they may have been read elsewhere.
+    """
+    for booking_id, flight_order in snapshots.items():
+        booking = await session.get(Booking, booking_id)
+        if booking is not None:
+            update_booking_snapshot(session, booking, flight_order)
+    await session.commit()
+
+
+async def update_booking_status(
+    session: AsyncSession, booking_id: uuid.UUID | str, status: str
+) -> Booking | None:
+    booking = await get_booking_by_id(session, booking_id)
+    if booking is None:
+        return None
+    booking.status = status
+    session.add(booking)
+    await session.commit()
+    return booking
+
+
+def mark_booking_cancelled(session: AsyncSession, booking: Booking):
+    """Flag the booking as cancelled, without committing."""
+    booking.status = BookingStatus.CANCELLED
+    booking.snapshot_updated_at = datetime.now(timezone.utc)
+    session.add(booking)
@@ -1,16 +1,215 @@
-from sqlmodel import Session, create_engine, SQLModel
+import time
+
+import jwt
+from fastapi import Request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
 import os
 
+from external_services.cache import async_redis_cache
+from utils.metrics import metrics
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional read replica for read-only endpoints, the primary serves them otherwise
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+# Per engine, so every worker process can open up to pool size + overflow connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side limit for a single statement on Postgres, 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+# After a user's own write their reads stay on the primary this long, to cover
+# replication lag
+DB_READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", 5))
+
+# Async drivers used on the request path for each sync driver in DATABASE_URL
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+class _InstrumentedPoolMixin:
+    """
+    Records how long a connection checkout takes (waiting for a free
+    connection, opening a new one and the pre-ping) and when it had to go
+    past the pool size into overflow. The pool's logging name is the engine
+    label used on the metrics.
+    """
+
+    def connect(self):
+        label = self._orig_logging_name or "default"
+        overflow = self.overflow()
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.incr("db_pool_checkout_timeouts_total", engine=label)
+            raise
+        finally:
+            metrics.observe(
+                "db_pool_checkout_seconds", time.perf_counter() - started, engine=label
+            )
+            if self.overflow() > max(overflow, 0):
+                metrics.incr("db_pool_overflow_total", engine=label)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def create_db_engine(
+    url: str, name: str, is_async: bool = False
+) -> Engine | AsyncEngine:
+    """
+    Build an engine from the ``DB_*`` settings and register its pool gauges
+    under ``engine=<name>``.
+
+    SQLite keeps SQLAlchemy's default pool, the sizing settings only apply
+    to server databases.
+    """
+    backend = make_url(url).get_backend_name()
+    options = {"echo": DB_ECHO}
+    if backend != "sqlite":
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_logging_name=name,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+            }
+        else:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+            }
+
+    if is_async:
+        db_engine = create_async_engine(url, **options)
+        pool_owner = db_engine.sync_engine
+    else:
+        db_engine = create_engine(url, **options)
+        pool_owner = db_engine
+
+    # Read through the engine, the pool object is replaced on dispose()
+    metrics.register_gauge(
+        "db_pool_connections_in_use", lambda: pool_owner.pool.checkedout(), engine=name
+    )
+    if isinstance(pool_owner.pool, QueuePool):
+        metrics.register_gauge(
+            "db_pool_overflow", lambda: max(pool_owner.pool.overflow(), 0), engine=name
+        )
+    return db_engine
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(
+    DATABASE_URL
+)
+
+# Sync engine for init_db and blocking callers; Alembic builds its own from DATABASE_URL
+engine = create_db_engine(DATABASE_URL, "sync")
+async_engine = create_db_engine(ASYNC_DATABASE_URL, "async", is_async=True)
+async_read_engine = (
+    create_db_engine(
+        _async_database_url(DATABASE_READ_URL), "async_read", is_async=True
+    )
+    if DATABASE_READ_URL
+    else async_engine
+)
+
+
+def _request_subject(request: Request) -> str | None:
+    """
+    Subject of the request's bearer token, used only to route its reads.
+    The signature is checked by ``get_current_user``, not here.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("sub")
+    except jwt.InvalidTokenError:
+        return None
+
+
+def _recent_write_key(subject: str) -> str:
+    return f"db:recent-write:{subject}"
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """
+    Remember, before the response goes out, that this user just committed a
+    write, so ``get_read_session`` keeps their next reads on the primary.
+    """
+    response = await call_next(request)
+    if async_read_engine is not async_engine and getattr(
+        request.state, "db_committed", False
+    ):
+        subject = _request_subject(request)
+        if subject:
+            await async_redis_cache.set(
+                _recent_write_key(subject), 1, DB_READ_YOUR_WRITES_SECONDS
+            )
+    return response
+
+
+async def get_session(request: Request):
+    # Objects stay usable after commit; reloading them would need another await
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+
+        @event.listens_for(session.sync_session, "after_commit")
+        def mark_committed(_):
+            request.state.db_committed = True
+
+        yield session
+
 
-engine = create_engine(DATABASE_URL, echo=True)
+async def get_read_session(request: Request):
+    """
+    Session for read-only endpoints and CRUD functions.
 
+    Uses the read replica when one is configured, except for a user who wrote
+    within the last ``DB_READ_YOUR_WRITES_SECONDS``. Nothing read here may be
+    written back through this session.
+    """
+    read_engine = async_read_engine
+    if read_engine is not async_engine:
+        subject = _request_subject(request)
+        if subject and await async_redis_cache.get(_recent_write_key(subject)):
+            read_engine = async_engine
+            metrics.incr("db_read_routed_total", target="primary")
+        else:
+            metrics.incr("db_read_routed_total", target="replica")
 
-def get_session():
-    with Session(engine) as session:
+    async with AsyncSession(read_engine, expire_on_commit=False) as session:
         yield session
 
 
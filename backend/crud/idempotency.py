@@ -0,0 +1,103 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.idempotency import IdempotencyKey, IdempotencyStatus
+
+
+async def claim_idempotency_key(
+    session: AsyncSession, user_id: uuid.UUID, key: str, request_hash: str
+) -> bool:
+    """
+    Insert an in-progress record for the key. Returns False when the key is
+    already taken, by a finished request or one still running.
+    """
+    session.add(IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash))
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        return False
+    return True
+
+
+async def get_idempotency_key(
+    session: AsyncSession, user_id: uuid.UUID, key: str
+) -> IdempotencyKey | None:
+    """Read the record as committed right now, not from the session's cache."""
+    return (
+        await session.exec(
+            select(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id)
+            .where(IdempotencyKey.key == key)
+            .execution_options(populate_existing=True)
+        )
+    ).first()
+
+
+async def complete_idempotency_key(
+    session: AsyncSession, user_id: uuid.UUID, key: str, response: dict
+):
+    record = await get_idempotency_key(session, user_id, key)
+    record.status = IdempotencyStatus.COMPLETED
+    record.response = response
+    session.add(record)
+    await session.commit()
+
+
+async def fail_idempotency_key(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    key: str,
+    claimed_before: datetime | None = None,
+):
+    """
+    Keep an in-progress key taken, its request may or may not have taken
+    effect; optionally only if it was claimed before ``claimed_before`` (an
+    abandoned claim).
+    """
+    query = (
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id)
+        .where(IdempotencyKey.key == key)
+        .where(IdempotencyKey.status == IdempotencyStatus.IN_PROGRESS)
+        .values(status=IdempotencyStatus.FAILED)
+    )
+    if claimed_before is not None:
+        query = query.where(IdempotencyKey.created_at < claimed_before)
+    await session.exec(query)
+    await session.commit()
+
+
+async def release_idempotency_key(session: AsyncSession, user_id: uuid.UUID, key: str):
+    """Delete an in-progress record so the key can be retried."""
+    await session.exec(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id)
+        .where(IdempotencyKey.key == key)
+        .where(IdempotencyKey.status == IdempotencyStatus.IN_PROGRESS)
+    )
+    await session.commit()
+
+
+async def purge_idempotency_keys(
+    session: AsyncSession, created_before: datetime
+) -> int:
+    """Delete finished records created before ``created_before``."""
+    result = await session.exec(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.status != IdempotencyStatus.IN_PROGRESS)
+        .where(IdempotencyKey.created_at < created_before)
+    )
+    await session.commit()
+    return result.rowcount
+
+
+def idempotency_key_age(record: IdempotencyKey) -> float:
+    created_at = record.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).total_seconds()
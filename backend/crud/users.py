@@ -1,99 +1,149 @@
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.users import UserInDB
 from utils.security import (
     hash_password,
+    invalidate_cached_user,
+    format_reset_token,
     generate_reset_token,
     hash_reset_token,
+    split_reset_token,
+    verify_legacy_reset_token,
     verify_reset_token,
 )
 from datetime import datetime, timedelta
 from typing import Optional
 
 
-def get_user_by_email(session: Session, email: str):
-    return session.exec(select(UserInDB).where(UserInDB.email == email)).first()
+async def get_user_by_email(session: AsyncSession, email: str):
+    return (await session.exec(select(UserInDB).where(UserInDB.email == email))).first()
 
 
-def create_user(session: Session, email: str, password: str):
-    hashed_password = hash_password(password)
+async def create_user(session: AsyncSession, email: str, password: str):
+    hashed_password = await hash_password(password)
     user = UserInDB(email=email, password=hashed_password)
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return user
 
 
-def create_password_reset_token(session: Session, email: str) -> Optional[str]:
+async def create_password_reset_token(
+    session: AsyncSession, email: str
+) -> Optional[str]:
     """
     Create a password reset token for a user.
     Returns the plain token if user exists, None otherwise.
     """
-    user = get_user_by_email(session, email)
+    user = await get_user_by_email(session, email)
     if not user:
         return None
 
-    # Generate token and hash it
-    plain_token = generate_reset_token()
-    hashed_token = hash_reset_token(plain_token)
+    # Generate token, only the verifier's hash is stored
+    selector, verifier = generate_reset_token()
 
     # Set expiration to 1 hour from now (timezone-naive for PostgreSQL TIMESTAMP compatibility)
     expires_at = datetime.now() + timedelta(hours=1)
 
     # Update user with reset token
-    user.reset_token = hashed_token
+    user.reset_token_selector = selector
+    user.reset_token = hash_reset_token(verifier)
     user.reset_token_expires = expires_at
     session.add(user)
-    session.commit()
+    await session.commit()
 
-    return plain_token
+    return format_reset_token(selector, verifier)
 
 
-def verify_password_reset_token(session: Session, token: str) -> Optional[UserInDB]:
+async def verify_password_reset_token(
+    session: AsyncSession, token: str
+) -> Optional[UserInDB]:
     """
     Verify a password reset token and return the user if valid.
     Returns None if token is invalid or expired.
     """
-    # Get all users with a reset token set
-    users = session.exec(
-        select(UserInDB).where(UserInDB.reset_token.is_not(None))
+    parts = split_reset_token(token)
+    if parts is None:
+        return await _verify_legacy_password_reset_token(session, token)
+
+    # One indexed lookup and one hash comparison, whatever the number of users
+    selector, verifier = parts
+    user = (
+        await session.exec(
+            select(UserInDB).where(UserInDB.reset_token_selector == selector)
+        )
+    ).first()
+    if (
+        user
+        and user.reset_token
+        and user.reset_token_expires
+        and user.reset_token_expires > datetime.now()
+        and verify_reset_token(verifier, user.reset_token)
+    ):
+        return user
+
+    return None
+
+
+async def _verify_legacy_password_reset_token(
+    session: AsyncSession, token: str
+) -> Optional[UserInDB]:
+    """
+    Tokens issued before selectors were introduced are bcrypt hashes without
+    a selector. Only those that have not expired are checked, so this scan
+    empties out within the token lifetime.
+    """
+    users = (
+        await session.exec(
+            select(UserInDB)
+            .where(UserInDB.reset_token_selector.is_(None))
+            .where(UserInDB.reset_token.is_not(None))
+            .where(UserInDB.reset_token_expires > datetime.now())
+        )
     ).all()
 
     for user in users:
-        # Check if token matches and hasn't expired
-        if user.reset_token and verify_reset_token(token, user.reset_token):
-            if user.reset_token_expires and user.reset_token_expires > datetime.now():
-                return user
+        if await verify_legacy_reset_token(token, user.reset_token):
+            return user
 
     return None
 
 
-def update_password_with_token(session: Session, token: str, new_password: str) -> bool:
+async def update_password_with_token(
+    session: AsyncSession, token: str, new_password: str
+) -> bool:
     """
     Update user password using reset token.
     Returns True if successful, False otherwise.
     """
-    user = verify_password_reset_token(session, token)
+    user = await verify_password_reset_token(session, token)
     if not user:
         return False
 
     # Update password
-    user.password = hash_password(new_password)
+    user.password = await hash_password(new_password)
 
     # Invalidate reset token
+    user.reset_token_selector = None
     user.reset_token = None
     user.reset_token_expires = None
 
+    # Revoke the access tokens issued with the old password
+    user.token_version += 1
+
     session.add(user)
-    session.commit()
+    await session.commit()
+    await invalidate_cached_user(user)
 
     return True
 
 
-def invalidate_reset_token(session: Session, user_id: str):
+async def invalidate_reset_token(session: AsyncSession, user_id: str):
     """Invalidate a user's reset token."""
-    user = session.get(UserInDB, user_id)
+    user = await session.get(UserInDB, user_id)
     if user:
+        user.reset_token_selector = None
         user.reset_token = None
         user.reset_token_expires = None
         session.add(user)
-        session.commit()
+        await session.commit()
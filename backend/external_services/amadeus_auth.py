@@ -0,0 +1,145 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from external_services.cache import AsyncRedisCache, async_redis_cache
+from utils.log_manager import get_app_logger
+from utils.metrics import metrics
+
+logger = get_app_logger(__name__)
+
+AMADEUS_TOKEN_CACHE_KEY = "amadeus:access-token"
+# Refresh this many seconds before the token expires
+AMADEUS_TOKEN_REFRESH_MARGIN = int(os.getenv("AMADEUS_TOKEN_REFRESH_MARGIN", 60))
+# How long another worker's in-flight refresh is waited for before fetching anyway
+AMADEUS_TOKEN_LOCK_TIMEOUT = float(os.getenv("AMADEUS_TOKEN_LOCK_TIMEOUT", 5))
+
+
+class AmadeusTokenManager:
+    """
+    Caches the Amadeus OAuth token in-process and in Redis.
+
+    - Concurrent callers in a worker share one fetch (single-flight lock), and
+      workers share one fetch through a short Redis lock.
+    - The token is refreshed in the background ``AMADEUS_TOKEN_REFRESH_MARGIN``
+      seconds before ``expires_in`` so requests never wait on the token endpoint.
+    """
+
+    def __init__(
+        self,
+        fetch_token: Callable[[], Awaitable[dict]],
+        cache: AsyncRedisCache = async_redis_cache,
+        cache_key: str = AMADEUS_TOKEN_CACHE_KEY,
+        refresh_margin: int = AMADEUS_TOKEN_REFRESH_MARGIN,
+    ):
+        self._fetch_token = fetch_token
+        self._cache = cache
+        self._cache_key = cache_key
+        self._refresh_margin = refresh_margin
+        self._access_token: str | None = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    def _is_valid(self, expires_at: float) -> bool:
+        # Keep a few seconds of slack so a token never expires mid-request
+        return time.time() < expires_at - 5
+
+    async def get_token(self) -> str:
+        if self._access_token and self._is_valid(self._expires_at):
+            return self._access_token
+
+        async with self._lock:
+            if self._access_token and self._is_valid(self._expires_at):
+                return self._access_token
+
+            if await self._load_shared():
+                return self._access_token
+
+            await self._refresh()
+            return self._access_token
+
+    async def invalidate(self):
+        """Drop the cached token, e.g. after Amadeus rejected it with 401."""
+        self._access_token = None
+        self._expires_at = 0.0
+        await self._cache.delete(self._cache_key)
+
+    async def _load_shared(self) -> bool:
+        shared = await self._cache.get(self._cache_key)
+        if not shared or not self._is_valid(shared.get("expires_at", 0)):
+            return False
+
+        self._access_token = shared["access_token"]
+        self._expires_at = shared["expires_at"]
+        self._schedule_refresh()
+        return True
+
+    async def _refresh(self):
+        lock_key = f"lock:{self._cache_key}"
+        owner = uuid.uuid4().hex
+        locked = await self._cache.set_if_absent(
+            lock_key, owner, int(AMADEUS_TOKEN_LOCK_TIMEOUT)
+        )
+        if not locked:
+            # Another worker is fetching: wait for it to publish the token
+            deadline = time.monotonic() + AMADEUS_TOKEN_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+                if await self._load_shared():
+                    return
+            # Fetch anyway, holding the lock only if the other one expired
+            locked = await self._cache.set_if_absent(
+                lock_key, owner, int(AMADEUS_TOKEN_LOCK_TIMEOUT)
+            )
+
+        try:
+            started = time.perf_counter()
+            try:
+                token = await self._fetch_token()
+            except Exception:
+                metrics.incr("amadeus_token_refresh_failures_total")
+                raise
+            metrics.incr("amadeus_token_refresh_total")
+            metrics.observe(
+                "amadeus_token_refresh_seconds", time.perf_counter() - started
+            )
+
+            expires_in = int(token.get("expires_in", 0))
+            self._access_token = token.get("access_token")
+            self._expires_at = time.time() + expires_in
+            await self._cache.set(
+                self._cache_key,
+                {"access_token": self._access_token, "expires_at": self._expires_at},
+                max(expires_in - self._refresh_margin, 1),
+            )
+            self._schedule_refresh()
+        finally:
+            if locked:
+                await self._cache.delete_if_value(lock_key, owner)
+
+    def _schedule_refresh(self):
+        task = self._refresh_task
+        if task and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+
+        delay = max(self._expires_at - self._refresh_margin - time.time(), 1)
+        self._refresh_task = asyncio.create_task(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay: float):
+        await asyncio.sleep(delay)
+        async with self._lock:
+            # Another worker may already have refreshed the shared token
+            shared = await self._cache.get(self._cache_key)
+            if shared and shared.get("expires_at", 0) > self._expires_at:
+                self._access_token = shared["access_token"]
+                self._expires_at = shared["expires_at"]
+                self._schedule_refresh()
+                return
+            try:
+                await self._refresh()
+            except Exception as e:
+                # Requests fall back to an inline refresh once the token expires
+                logger.warning(f"Background Amadeus token refresh failed: {e}")
@@ -0,0 +1,119 @@
+import asyncio
+import os
+from datetime import timedelta
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from crud.bookings import (
+    get_stale_bookings,
+    mark_booking_snapshot_missing,
+    update_booking_snapshot,
+)
+from crud.database import async_engine
+from external_services.cache import AsyncRedisCache, async_redis_cache
+from external_services.flight import async_amadeus_flight_service
+from models.bookings import Booking
+from utils.log_manager import get_app_logger
+from utils.metrics import metrics
+
+logger = get_app_logger(__name__)
+
+BOOKING_SNAPSHOT_REFRESH_ENABLED = (
+    os.getenv("BOOKING_SNAPSHOT_REFRESH_ENABLED", "true").lower() == "true"
+)
+# Snapshots older than this are re-synced with Amadeus
+BOOKING_SNAPSHOT_MAX_AGE = int(os.getenv("BOOKING_SNAPSHOT_MAX_AGE", 3600))
+BOOKING_SNAPSHOT_REFRESH_INTERVAL = int(
+    os.getenv("BOOKING_SNAPSHOT_REFRESH_INTERVAL", 300)
+)
+BOOKING_SNAPSHOT_REFRESH_BATCH = int(os.getenv("BOOKING_SNAPSHOT_REFRESH_BATCH", 50))
+# Taken for one interval by the worker that runs the refresh
+BOOKING_SNAPSHOT_REFRESH_LOCK = "lock:booking_snapshot_refresh"
+
+
+class BookingSnapshotRefresher:
+    """
+    Periodically re-syncs the flight order snapshots stored on bookings.
+
+    Bookings are served from their snapshot, so Amadeus is only called here,
+    in batches of at most ``batch_size`` stale, upcoming bookings per run.
+    Every worker runs a refresher, but a Redis lock held for ``interval``
+    lets only one of them refresh per interval. Orders that Amadeus no longer
+    returns keep their status and snapshot and are only logged.
+    """
+
+    def __init__(
+        self,
+        service=async_amadeus_flight_service,
+        max_age: int = BOOKING_SNAPSHOT_MAX_AGE,
+        interval: int = BOOKING_SNAPSHOT_REFRESH_INTERVAL,
+        batch_size: int = BOOKING_SNAPSHOT_REFRESH_BATCH,
+        cache: AsyncRedisCache = async_redis_cache,
+    ):
+        self.service = service
+        self._cache = cache
+        self.max_age = timedelta(seconds=max_age)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Never released, so the next run starts an interval later
+                if await self._cache.set_if_absent(
+                    BOOKING_SNAPSHOT_REFRESH_LOCK, 1, self.interval
+                ):
+                    await self.refresh_stale()
+            except Exception as e:
+                logger.warning(f"Booking snapshot refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh_stale(self) -> int:
+        """Re-sync one batch of stale snapshots. Returns the number of bookings."""
+        # Separate sessions so no connection is held during the Amadeus calls
+        async with AsyncSession(async_engine) as session:
+            bookings = await get_stale_bookings(session, self.max_age, self.batch_size)
+            stale = {booking.id: booking.flight_order_id for booking in bookings}
+        if not stale:
+            return 0
+
+        orders = await self.service.get_flight_orders(list(stale.values()))
+
+        async with AsyncSession(async_engine) as session:
+            for booking_id, order in zip(stale, orders):
+                booking = await session.get(Booking, booking_id)
+                if booking is None:
+                    continue
+                error = order.get("error")
+                if error is None:
+                    update_booking_snapshot(session, booking, order)
+                    result = "updated"
+                elif error["status"] == 404:
+                    logger.warning(
+                        f"Flight order {booking.flight_order_id} of booking "
+                        f"{booking.id} was not found in Amadeus"
+                    )
+                    mark_booking_snapshot_missing(session, booking)
+                    result = "missing"
+                else:
+                    result = "failed"
+                metrics.incr("booking_snapshot_refresh_total", result=result)
+            await session.commit()
+        return len(stale)
+
+
+booking_snapshot_refresher = BookingSnapshotRefresher()
@@ -1,30 +1,533 @@
 import redis
+import redis.asyncio
 import json
 import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
 
+from utils.metrics import metrics
 
-class RedisCache:
-    def __init__(self, host: str, port: int):
-        self.r = redis.Redis(host=host, port=port, db=0, decode_responses=True)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-    def set(self, key: str, value, expiration_seconds: int = 300):
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Freshness policy for a cache namespace.
+
+    Entries are served as fresh for ``soft_ttl`` seconds, then served stale
+    (while being refreshed in the background) until ``hard_ttl`` seconds,
+    when Redis drops them.
+    """
+
+    soft_ttl: int
+    hard_ttl: int
+
+
+CACHE_POLICIES = {
+    "flight_search": CachePolicy(
+        soft_ttl=int(os.getenv("FLIGHT_SEARCH_CACHE_SOFT_TTL", 300)),
+        hard_ttl=int(os.getenv("FLIGHT_SEARCH_CACHE_HARD_TTL", 900)),
+    ),
+    "locations": CachePolicy(
+        soft_ttl=int(os.getenv("LOCATIONS_CACHE_SOFT_TTL", 86400)),
+        hard_ttl=int(os.getenv("LOCATIONS_CACHE_HARD_TTL", 604800)),
+    ),
+}
+
+# Marks values stored with a CachePolicy so plain entries can share the keyspace
+_POLICY_ENVELOPE_KEY = "__stale_at__"
+
+CACHE_L1_ENABLED = os.getenv("CACHE_L1_ENABLED", "true").lower() == "true"
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", 1000))
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024))
+# Key namespaces (the part before the first ":") that are also kept in-process
+CACHE_L1_NAMESPACES = os.getenv(
+    "CACHE_L1_NAMESPACES", "flight_search,flight_search_post,locations,user"
+).split(",")
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 2))
+
+_REDIS_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+# Identifies this worker's own invalidation messages, which it can ignore
+_INSTANCE_ID = uuid.uuid4().hex
+
+# Deletes a key only while it still holds the caller's value, so a lock that
+# expired and was taken by another worker is left alone
+_COMPARE_AND_DELETE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _wrap_with_policy(value, policy: CachePolicy) -> dict:
+    return {_POLICY_ENVELOPE_KEY: time.time() + policy.soft_ttl, "value": value}
+
+
+def _unwrap(cached) -> tuple[object, bool]:
+    if isinstance(cached, dict) and _POLICY_ENVELOPE_KEY in cached:
+        return cached["value"], time.time() >= cached[_POLICY_ENVELOPE_KEY]
+    return cached, False
+
+
+def _uses_local(local: "LocalCache | None", key: str) -> bool:
+    return local is not None and key.split(":", 1)[0] in CACHE_L1_NAMESPACES
+
+
+# Cached payloads start with a marker byte naming their serializer and
+# compression. Markers are control characters that JSON text never starts
+# with, so entries without one (legacy JSON text) can live side by side.
+_MARKERS = {
+    ("json", None): 0x01,
+    ("json", "zlib"): 0x02,
+    ("json", "zstd"): 0x03,
+    ("msgpack", None): 0x04,
+    ("msgpack", "zlib"): 0x05,
+    ("msgpack", "zstd"): 0x06,
+}
+_FORMATS = {marker: format for format, marker in _MARKERS.items()}
+
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "orjson" if orjson else "json")
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd" if zstandard else "zlib")
+CACHE_COMPRESSION_THRESHOLD = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", 1024))
+CACHE_COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", 3))
+
+
+class CacheCodec:
+    """
+    Turns cached values into bytes and back.
+
+    ``serializer`` is ``json``, ``orjson`` (same wire format as json, faster)
+    or ``msgpack``; payloads larger than ``compress_threshold`` bytes are
+    compressed with ``zlib`` or ``zstd``. Decoding reads the marker byte, so
+    entries written with any codec (or none) can be read back wherever the
+    libraries they need are installed; otherwise decoding raises ValueError.
+    """
+
+    def __init__(
+        self,
+        serializer: str = "json",
+        compression: str | None = "zlib",
+        compress_threshold: int = 1024,
+        level: int = 3,
+    ):
+        if serializer == "orjson" and orjson is None:
+            serializer = "json"
+        if serializer == "msgpack" and msgpack is None:
+            raise ValueError("msgpack is not installed")
+        if compression == "zstd" and zstandard is None:
+            compression = "zlib"
+        if compression not in (None, "zlib", "zstd"):
+            raise ValueError(f"Unknown cache compression: {compression}")
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.level = level
+
+    def encode(self, value) -> bytes:
+        return self.encode_sized(value)[0]
+
+    def decode(self, data: bytes):
+        return self.decode_sized(data)[0]
+
+    def encode_sized(self, value) -> tuple[bytes, int]:
+        """The encoded value and its size before compression."""
+        if self.serializer == "msgpack":
+            payload = msgpack.packb(value)
+        elif self.serializer == "orjson":
+            payload = orjson.dumps(value)
+        else:
+            payload = json.dumps(value, separators=(",", ":")).encode()
+
+        serializer = "msgpack" if self.serializer == "msgpack" else "json"
+        compression = (
+            self.compression if len(payload) > self.compress_threshold else None
+        )
+        size = len(payload)
+        if compression == "zstd":
+            payload = zstandard.ZstdCompressor(level=self.level).compress(payload)
+        elif compression == "zlib":
+            payload = zlib.compress(payload, self.level)
+
+        return bytes([_MARKERS[serializer, compression]]) + payload, size
+
+    def decode_sized(self, data: bytes) -> tuple[object, int]:
+        """The decoded value and its size once decompressed."""
+        format = _FORMATS.get(data[0])
+        if format is None:
+            # Legacy entry written as JSON text
+            return json.loads(data), len(data)
+
+        serializer, compression = format
+        if (compression == "zstd" and zstandard is None) or (
+            serializer == "msgpack" and msgpack is None
+        ):
+            raise ValueError(f"Cannot decode {serializer}/{compression} entries here")
+        payload = data[1:]
+        if compression == "zstd":
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif compression == "zlib":
+            payload = zlib.decompress(payload)
+
+        if serializer == "msgpack":
+            return msgpack.unpackb(payload), len(payload)
+        return (orjson.loads(payload) if orjson else json.loads(payload)), len(payload)
+
+
+default_codec = CacheCodec(
+    CACHE_SERIALIZER,
+    CACHE_COMPRESSION or None,
+    CACHE_COMPRESSION_THRESHOLD,
+    CACHE_COMPRESSION_LEVEL,
+)
+
+
+class LocalCache:
+    """
+    In-process LRU cache bounded by entry count and by bytes, each value
+    counting as its uncompressed serialised size.
+
+    Each entry expires at the same time as its Redis copy. Values are shared
+    between callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: OrderedDict[str, tuple[object, int, float]] = OrderedDict()
+        # The invalidation listener runs in its own thread
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> tuple[bool, object]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, size, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value, size: int, ttl_seconds: float):
+        if size > self.max_bytes or ttl_seconds <= 0:
+            self.delete(key)
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + ttl_seconds)
+            self.size_bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.size_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def disable(self):
+        """Stop keeping entries, e.g. when invalidations cannot be received."""
+        self.max_entries = 0
+        self.clear()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+
+
+class CacheInvalidationListener:
+    """
+    Keeps the in-process cache consistent across workers: every write or
+    delete of a cached key is published on ``CACHE_INVALIDATION_CHANNEL`` by
+    ``AsyncRedisCache``, and this listener drops the local copies written by
+    other workers. redis.asyncio has no threaded pub/sub, so it runs on a
+    sync client in its own thread.
+    """
+
+    def __init__(self, host: str, port: int, local: LocalCache | None = None):
+        self.r = redis.Redis(host=host, port=port, db=0)
+        self.local = local
+        self._invalidation_thread = None
+
+    def _handle_invalidation(self, message: dict):
+        instance_id, _, key = message["data"].decode().partition(":")
+        if instance_id != _INSTANCE_ID:
+            self.local.delete(key)
+
+    def _handle_listener_error(self, error, pubsub, thread):
+        # Invalidations may have been missed while disconnected
+        print(f"Redis invalidation listener error: {error}")
+        self.local.clear()
+        time.sleep(1)
+
+    def start(self):
+        """
+        Drop in-process copies when another worker writes or deletes a key.
+        """
+        if self.local is None or self._invalidation_thread is not None:
+            return
         try:
-            json_value = json.dumps(value)
-            self.r.setex(key, expiration_seconds, json_value)
+            pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{CACHE_INVALIDATION_CHANNEL: self._handle_invalidation})
+            self._invalidation_thread = pubsub.run_in_thread(
+                sleep_time=1,
+                daemon=True,
+                exception_handler=self._handle_listener_error,
+            )
         except redis.exceptions.ConnectionError as e:
+            # Without invalidations the in-process copies could go stale
+            print(f"Redis connection error, in-process cache disabled: {e}")
+            self.local.disable()
+
+    def stop(self):
+        if self._invalidation_thread is not None:
+            self._invalidation_thread.stop()
+            self._invalidation_thread = None
+
+
+class AsyncRedisCache:
+    """
+    Redis cache built on ``redis.asyncio`` with an explicit connection pool,
+    for use inside async handlers.
+
+    Keys in ``CACHE_L1_NAMESPACES`` are also kept in the in-process ``local``
+    cache, which ``CacheInvalidationListener`` keeps consistent across
+    workers. Batched ``mget``/``mset`` pipeline every key into a single round
+    trip.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        local: LocalCache | None = None,
+        max_connections: int = REDIS_MAX_CONNECTIONS,
+        codec: CacheCodec = default_codec,
+    ):
+        self.pool = redis.asyncio.ConnectionPool(
+            host=host,
+            port=int(port),
+            db=0,
+            max_connections=max_connections,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        )
+        self.r = redis.asyncio.Redis(connection_pool=self.pool)
+        self.local = local
+        self.codec = codec
+        self._compare_and_delete = self.r.register_script(_COMPARE_AND_DELETE)
+
+    async def get(self, key: str):
+        return (await self.mget([key]))[0]
+
+    async def set(self, key: str, value, expiration_seconds: int = 300):
+        await self.mset({key: value}, expiration_seconds)
+
+    async def mget(self, keys: list[str]) -> list:
+        """Return the values for ``keys`` in order, ``None`` for misses."""
+        values = [None] * len(keys)
+        pending = []
+        for index, key in enumerate(keys):
+            if _uses_local(self.local, key):
+                found, value = self.local.get(key)
+                result = "hit" if found else "miss"
+                metrics.incr("cache_layer_requests_total", layer="l1", result=result)
+                if found:
+                    values[index] = value
+                    continue
+            pending.append(index)
+
+        if not pending:
+            return values
+
+        try:
+            # Values and their remaining TTLs, all in one round trip
+            pipe = self.r.pipeline(transaction=False)
+            for index in pending:
+                pipe.get(keys[index])
+                pipe.pttl(keys[index])
+            replies = await pipe.execute()
+        except _REDIS_ERRORS as e:
             print(f"Redis connection error: {e}")
+            return values
+
+        unreadable = []
+        for position, index in enumerate(pending):
+            key = keys[index]
+            data, ttl_ms = replies[2 * position], replies[2 * position + 1]
+            uses_local = _uses_local(self.local, key)
+            decoded = self._decode(key, data) if data else None
+            if decoded is None:
+                if data:
+                    unreadable.append(key)
+                if uses_local:
+                    metrics.incr(
+                        "cache_layer_requests_total", layer="l2", result="miss"
+                    )
+                continue
 
-    def get(self, key: str):
+            values[index], size = decoded
+            if uses_local:
+                metrics.incr("cache_layer_requests_total", layer="l2", result="hit")
+                if ttl_ms and ttl_ms > 0:
+                    self.local.set(key, values[index], size, ttl_ms / 1000)
+        if unreadable:
+            await self.delete(*unreadable)
+        return values
+
+    def _decode(self, key: str, data: bytes) -> tuple[object, int] | None:
+        """Decode an entry, None if it cannot be read (then it is a miss)."""
         try:
-            json_value = self.r.get(key)
-            if json_value:
-                return json.loads(json_value)
+            return self.codec.decode_sized(data)
+        except Exception as e:
+            metrics.incr("cache_decode_errors_total")
+            print(f"Cache entry {key} could not be decoded: {e!r}")
             return None
-        except redis.exceptions.ConnectionError as e:
+
+    async def mset(self, items: dict, expiration_seconds: int = 300):
+        """Store every item with the same TTL using one pipelined round trip."""
+        encoded = {key: self.codec.encode_sized(value) for key, value in items.items()}
+        try:
+            pipe = self.r.pipeline(transaction=False)
+            for key, (data, _) in encoded.items():
+                pipe.setex(key, expiration_seconds, data)
+                if _uses_local(self.local, key):
+                    pipe.publish(CACHE_INVALIDATION_CHANNEL, f"{_INSTANCE_ID}:{key}")
+            await pipe.execute()
+        except _REDIS_ERRORS as e:
             print(f"Redis connection error: {e}")
-            return None
+            return
+
+        for key, (_, size) in encoded.items():
+            if _uses_local(self.local, key):
+                self.local.set(key, items[key], size, expiration_seconds)
+
+    async def set_with_policy(self, key: str, value, policy: CachePolicy):
+        """Store ``value`` under ``policy``: fresh for soft_ttl, kept for hard_ttl."""
+        await self.set(key, _wrap_with_policy(value, policy), policy.hard_ttl)
+
+    async def get_with_staleness(self, key: str) -> tuple[object, bool]:
+        """
+        Return ``(value, is_stale)``. Plain entries are never stale; a missing
+        entry is ``(None, False)``.
+        """
+        return _unwrap(await self.get(key))
+
+    async def set_if_absent(
+        self, key: str, value, expiration_seconds: int = 300
+    ) -> bool:
+        """
+        Store ``value`` only if ``key`` does not exist yet (SET NX).
+
+        Returns True when the value was stored. If Redis is unreachable the
+        caller is allowed to proceed as if it had won.
+        """
+        try:
+            return bool(
+                await self.r.set(
+                    key, self.codec.encode(value), ex=expiration_seconds, nx=True
+                )
+            )
+        except _REDIS_ERRORS as e:
+            print(f"Redis connection error: {e}")
+            return True
+
+    async def delete_if_value(self, key: str, value) -> bool:
+        """
+        Delete ``key`` only if it still holds ``value`` (compare-and-delete).
+
+        Used to release locks taken with ``set_if_absent``, the value being an
+        owner token. Returns True when the key was deleted.
+        """
+        try:
+            return bool(
+                await self._compare_and_delete(
+                    keys=[key], args=[self.codec.encode(value)]
+                )
+            )
+        except _REDIS_ERRORS as e:
+            print(f"Redis connection error: {e}")
+            return False
+
+    async def delete(self, *keys: str):
+        if not keys:
+            return
+        try:
+            pipe = self.r.pipeline(transaction=False)
+            pipe.delete(*keys)
+            for key in keys:
+                if _uses_local(self.local, key):
+                    pipe.publish(CACHE_INVALIDATION_CHANNEL, f"{_INSTANCE_ID}:{key}")
+            await pipe.execute()
+        except _REDIS_ERRORS as e:
+            print(f"Redis connection error: {e}")
+
+        for key in keys:
+            if _uses_local(self.local, key):
+                self.local.delete(key)
+
+    async def close(self):
+        await self.r.aclose()
+        await self.pool.disconnect()
+
+
+def _hit_ratio(layer: str) -> float:
+    hits = metrics.counter("cache_layer_requests_total", layer=layer, result="hit")
+    misses = metrics.counter("cache_layer_requests_total", layer=layer, result="miss")
+    return hits / (hits + misses) if hits + misses else 0.0
 
 
 host = os.getenv("REDIS_HOST", "redis")
 port = os.getenv("REDIS_PORT", 6379)
-redis_cache = RedisCache(host, port)
+local_cache = (
+    LocalCache(CACHE_L1_MAX_ENTRIES, CACHE_L1_MAX_BYTES) if CACHE_L1_ENABLED else None
+)
+cache_invalidation_listener = CacheInvalidationListener(host, port, local_cache)
+async_redis_cache = AsyncRedisCache(host, port, local=local_cache)
+
+metrics.register_gauge("cache_hit_ratio", lambda: _hit_ratio("l1"), layer="l1")
+metrics.register_gauge("cache_hit_ratio", lambda: _hit_ratio("l2"), layer="l2")
+metrics.register_gauge(
+    "cache_l1_entries", lambda: len(local_cache) if local_cache else 0
+)
+metrics.register_gauge(
+    "cache_l1_bytes", lambda: local_cache.size_bytes if local_cache else 0
+)
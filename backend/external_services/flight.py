@@ -1,11 +1,51 @@
 import os
 import json
+import time
+import asyncio
+import httpx
 import requests
-from amadeus import Client, ResponseError, Location
+from amadeus import Client, ResponseError, Location, Response
+from amadeus.client.errors import ClientError, NetworkError, ServerError
 from dotenv import load_dotenv
+from external_services.amadeus_auth import AmadeusTokenManager
+from external_services.resilience import (
+    NO_RETRY,
+    AdaptiveRateLimiter,
+    CircuitBreaker,
+    DeadlineExceededError,
+    HedgeBudget,
+    LatencyTracker,
+    RetryPolicy,
+    UpstreamUnavailableError,
+    parse_retry_after,
+)
+from utils.deadline import time_remaining
+from utils.metrics import metrics
 
 load_dotenv()
 
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com")
+AMADEUS_HTTP_MAX_CONNECTIONS = int(os.getenv("AMADEUS_HTTP_MAX_CONNECTIONS", 100))
+AMADEUS_HTTP_MAX_KEEPALIVE = int(os.getenv("AMADEUS_HTTP_MAX_KEEPALIVE", 20))
+AMADEUS_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("AMADEUS_HTTP_KEEPALIVE_EXPIRY", 30))
+AMADEUS_HTTP_CONNECT_TIMEOUT = float(os.getenv("AMADEUS_HTTP_CONNECT_TIMEOUT", 5))
+AMADEUS_HTTP_READ_TIMEOUT = float(os.getenv("AMADEUS_HTTP_READ_TIMEOUT", 30))
+AMADEUS_HTTP_POOL_TIMEOUT = float(os.getenv("AMADEUS_HTTP_POOL_TIMEOUT", 10))
+AMADEUS_HTTP2 = os.getenv("AMADEUS_HTTP2", "true").lower() == "true"
+AMADEUS_ORDER_FETCH_CONCURRENCY = int(os.getenv("AMADEUS_ORDER_FETCH_CONCURRENCY", 10))
+AMADEUS_ORDER_FETCH_TIMEOUT = float(os.getenv("AMADEUS_ORDER_FETCH_TIMEOUT", 10))
+
+# Upstream operations, each with its own circuit breaker
+AMADEUS_OPERATIONS = ("search", "pricing", "orders", "seatmaps", "locations")
+# Operations whose GET calls are hedged, e.g. "search,locations"; off by default
+AMADEUS_HEDGED_OPERATIONS = {
+    name.strip()
+    for name in os.getenv("AMADEUS_HEDGED_OPERATIONS", "").split(",")
+    if name.strip()
+}
+# A hedge is sent once the first call is slower than this percentile of recent calls
+AMADEUS_HEDGE_PERCENTILE = float(os.getenv("AMADEUS_HEDGE_PERCENTILE", 95))
+
 
 class AmadeusFlightService:
     def __init__(self):
@@ -232,4 +272,503 @@ class AmadeusFlightService:
             raise error
 
 
-amadeus_flight_service = AmadeusFlightService()
\ No newline at end of file
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``httpx[http2]``)."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide pooled HTTP client used for Amadeus calls.
+
+    The client is created lazily so it binds to the running event loop, and is
+    shared by every request so connections are kept alive and reused.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=AMADEUS_BASE_URL,
+            http2=AMADEUS_HTTP2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=AMADEUS_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=AMADEUS_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=AMADEUS_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                AMADEUS_HTTP_READ_TIMEOUT,
+                connect=AMADEUS_HTTP_CONNECT_TIMEOUT,
+                pool=AMADEUS_HTTP_POOL_TIMEOUT,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _to_amadeus_response(http_response: httpx.Response | None) -> Response:
+    """
+    Wrap an httpx response in the SDK's ``Response`` so callers keep using
+    ``.data``, ``.body`` and ``.status_code`` and the SDK error classes.
+    """
+    response = Response(http_response, None)
+    response.status_code = http_response.status_code if http_response else None
+    response.headers = dict(http_response.headers) if http_response else {}
+    response.body = http_response.text if http_response else None
+    response.parsed = False
+    response.result = None
+    response.data = None
+    if http_response is not None and http_response.content:
+        try:
+            response.result = http_response.json()
+            response.parsed = True
+        except ValueError:
+            pass
+    if isinstance(response.result, dict):
+        response.data = response.result.get("data")
+    return response
+
+
+def _flight_order_error(order_id: str, status_code: int, detail: str) -> dict:
+    return {"id": order_id, "error": {"status": status_code, "detail": detail}}
+
+
+class AsyncAmadeusFlightService:
+    """
+    Asyncio flavour of ``AmadeusFlightService``.
+
+    Talks to the Amadeus REST API directly through the shared pooled
+    ``httpx.AsyncClient`` so a slow upstream call never blocks the event loop.
+    Methods return the same payloads and raise the same SDK ``ResponseError``
+    subclasses as the synchronous service.
+
+    Every call goes through the circuit breaker of its operation and the
+    shared rate limiter; when either refuses it, ``UpstreamUnavailableError``
+    is raised without calling Amadeus. Calls respect the deadline of the API
+    request they serve (``utils.deadline``), idempotent ones are retried and
+    GET calls of ``hedged_operations`` are hedged.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        rate_limiter: AdaptiveRateLimiter | None = None,
+    ):
+        self.api_key, self.api_secret = amadeus_flight_service.get_amadeus_credentials()
+        self._client = client
+        self.token_manager = AmadeusTokenManager(self._fetch_access_token)
+        self.breakers = {name: CircuitBreaker(name) for name in AMADEUS_OPERATIONS}
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.retry_policies = {name: RetryPolicy() for name in AMADEUS_OPERATIONS}
+        self.latency = {name: LatencyTracker() for name in AMADEUS_OPERATIONS}
+        self.hedged_operations = set(AMADEUS_HEDGED_OPERATIONS)
+        self.hedge_budget = HedgeBudget()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client()
+
+    async def _fetch_access_token(self) -> dict:
+        response = await self.client.post(
+            "/v1/security/oauth2/token",
+            data={
+                "grant_type": "client_credentials",
+                "client_id": self.api_key,
+                "client_secret": self.api_secret,
+            },
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        json_body: dict | None = None,
+        idempotent: bool = True,
+    ) -> Response:
+        """
+        Send an authenticated request and translate failures into SDK errors.
+
+        Idempotent calls are retried on network errors, 5xx and 429 under the
+        operation's ``RetryPolicy``, as long as the request deadline leaves
+        time for the wait and another attempt.
+        """
+        policy = self.retry_policies[operation] if idempotent else NO_RETRY
+        attempt = 1
+        while True:
+            try:
+                return await self._attempt(
+                    operation, method, path, params, json_body, idempotent
+                )
+            except (NetworkError, ServerError, ClientError) as error:
+                status_code = error.response.status_code or 0
+                retryable = (
+                    isinstance(error, NetworkError)
+                    or status_code == 429
+                    or status_code >= 500
+                )
+                if not retryable or attempt >= policy.max_attempts:
+                    raise
+                delay = policy.backoff(attempt)
+                if status_code == 429:
+                    delay = max(
+                        delay,
+                        parse_retry_after(error.response.headers.get("retry-after"))
+                        or 0,
+                    )
+                remaining = time_remaining()
+                if remaining is not None and delay >= remaining:
+                    raise
+            metrics.incr("amadeus_retries_total", operation=operation)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        params: dict | None,
+        json_body: dict | None,
+        idempotent: bool,
+    ) -> Response:
+        """
+        Make one attempt, hedged for GET calls of ``hedged_operations``: when
+        the call is slower than ``AMADEUS_HEDGE_PERCENTILE`` of the recent
+        ones, an identical second call is sent if the hedge budget allows, the
+        first to succeed is used and the other one cancelled.
+        """
+
+        def send():
+            return self._send(operation, method, path, params, json_body, idempotent)
+
+        if method != "GET" or operation not in self.hedged_operations:
+            return await send()
+
+        metrics.incr("amadeus_hedgeable_calls_total", operation=operation)
+        self.hedge_budget.record_call()
+        delay = self.latency[operation].percentile(AMADEUS_HEDGE_PERCENTILE)
+        if delay is None:
+            return await send()
+
+        tasks = [asyncio.create_task(send())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self.hedge_budget.try_spend():
+                return await tasks[0]
+
+            metrics.incr("amadeus_hedges_total", operation=operation)
+            tasks.append(asyncio.create_task(send()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    if succeeded[0] is tasks[1]:
+                        metrics.incr("amadeus_hedge_wins_total", operation=operation)
+                    return succeeded[0].result()
+            # Both failed, report the first call's error
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        params: dict | None,
+        json_body: dict | None,
+        idempotent: bool,
+    ) -> Response:
+        """
+        Make one attempt. Server errors, 429s and network failures count
+        against the operation's circuit; other responses, client errors
+        included, show that Amadeus is up.
+
+        Idempotent calls are cut short at the request deadline. Others only
+        check it before sending, since abandoning them midway would leave
+        their outcome unknown: for them ``UpstreamUnavailableError`` is only
+        raised before the request goes out.
+        """
+        remaining = time_remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError()
+        timeout = httpx.USE_CLIENT_DEFAULT
+        cut_by_deadline = (
+            idempotent
+            and remaining is not None
+            and remaining < AMADEUS_HTTP_READ_TIMEOUT
+        )
+        if cut_by_deadline:
+            timeout = httpx.Timeout(
+                remaining,
+                connect=min(AMADEUS_HTTP_CONNECT_TIMEOUT, remaining),
+                pool=min(AMADEUS_HTTP_POOL_TIMEOUT, remaining),
+            )
+
+        breaker = self.breakers[operation]
+        breaker.before_call()
+        try:
+            await self.rate_limiter.acquire(remaining)
+            try:
+                token = await self.token_manager.get_token()
+            except Exception as error:
+                raise UpstreamUnavailableError(
+                    "Amadeus access token unavailable", 1
+                ) from error
+            started = time.perf_counter()
+            http_response = await self.client.request(
+                method,
+                path,
+                params=params,
+                json=json_body,
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=timeout,
+            )
+        except httpx.TimeoutException as error:
+            if cut_by_deadline and time_remaining() <= 0:
+                # Our own deadline, not a sign that Amadeus is failing
+                breaker.release()
+                raise DeadlineExceededError() from error
+            breaker.record_failure()
+            raise NetworkError(_to_amadeus_response(None)) from error
+        except httpx.HTTPError as error:
+            breaker.record_failure()
+            raise NetworkError(_to_amadeus_response(None)) from error
+        except BaseException:
+            breaker.release()
+            raise
+
+        response = _to_amadeus_response(http_response)
+        if response.status_code == 429:
+            self.rate_limiter.record_throttled(
+                parse_retry_after(http_response.headers.get("Retry-After"))
+            )
+        else:
+            self.rate_limiter.record_success()
+        if response.status_code == 429 or response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+            self.latency[operation].record(time.perf_counter() - started)
+
+        error_class = Response.error_for(response.status_code, response.parsed)
+        if error_class is not None:
+            if response.status_code == 401:
+                await self.token_manager.invalidate()
+            raise error_class(response)
+        return response
+
+    async def search_flights(self, request_body: dict) -> dict:
+        """
+        Search for flight offers using Amadeus POST endpoint.
+        """
+        try:
+            # Amadeus requires: { "data": { ... } }
+            payload = {"data": request_body}
+            response = await self._request(
+                "search", "POST", "/v2/shopping/flight-offers", json_body=payload
+            )
+            return response.data
+        except ResponseError as api_error:
+            print(f"Flight search error: {api_error}")
+            if api_error.response.body:
+                print(f"Response body: {api_error.response.body}")
+            raise api_error
+
+    async def confirm_price(self, request_body: dict):
+        """
+        Confirm flight pricing using Amadeus pricing endpoint.
+        """
+        body = {
+            "data": {"type": "flight-offers-pricing", "flightOffers": [request_body]}
+        }
+        try:
+            response = await self._request(
+                "pricing", "POST", "/v1/shopping/flight-offers/pricing", json_body=body
+            )
+            return response.data
+        except ResponseError as error:
+            print(f"Price confirmation error: {error}")
+            print(f"Response body: {error.response.body}")
+            raise error
+
+    async def create_flight_order(self, request_body: dict):
+        """
+        Creates a flight order using a pre-selected and price-confirmed flight offer.
+
+        IMPORTANT: The flight offer must be recent (from a fresh search/pricing call).
+        Amadeus flight offers expire quickly and cannot be booked after they become stale.
+        """
+        flight_offer = request_body.get("flight_offer")
+        travelers = request_body.get("travelers")
+
+        if not flight_offer:
+            raise ValueError("flight_offer is required in request body")
+        if not travelers:
+            raise ValueError("travelers information is required")
+
+        body = {
+            "data": {
+                "type": "flight-order",
+                "flightOffers": [flight_offer],
+                "travelers": travelers,
+            }
+        }
+        try:
+            response = await self._request(
+                "orders",
+                "POST",
+                "/v1/booking/flight-orders",
+                json_body=body,
+                idempotent=False,
+            )
+            return response.data
+        except ResponseError as error:
+            print(f"Amadeus API Error: {error}")
+            print(f"Response body: {error.response.body}")
+            raise error
+
+    async def search_flights_get(self, request_body: dict) -> dict:
+        """
+        Search for flights using GET method (simpler parameters).
+        """
+        try:
+            response = await self._request(
+                "search", "GET", "/v2/shopping/flight-offers", params=request_body
+            )
+            return response.data
+        except ResponseError as error:
+            print(f"Flight search GET error: {error}")
+            print(f"Response body: {error.response.body}")
+            raise error
+
+    async def view_seat_map_get(self, flightorderId: str) -> dict:
+        """
+        View seat map for a flight order.
+        """
+        response = await self._request(
+            "seatmaps",
+            "GET",
+            "/v1/shopping/seatmaps",
+            params={"flightOrderId": flightorderId},
+        )
+        return response.data
+
+    async def view_seat_map_post(self, flight_offer: dict) -> dict:
+        """
+        View seat map for a flight offer.
+        """
+        body = {"data": [flight_offer]}
+        response = await self._request(
+            "seatmaps", "POST", "/v1/shopping/seatmaps", json_body=body
+        )
+        return response.data
+
+    async def get_flight_order(self, flight_orderId: str) -> dict:
+        """
+        Retrieves flight order details using the Amadeus Flight Orders API.
+        """
+        response = await self._request(
+            "orders", "GET", f"/v1/booking/flight-orders/{flight_orderId}"
+        )
+        return response.data
+
+    async def cancel_flight_order(self, flight_orderId: str) -> Response:
+        """
+        Cancels a flight order using the Amadeus Flight Orders API.
+        """
+        return await self._request(
+            "orders",
+            "DELETE",
+            f"/v1/booking/flight-orders/{flight_orderId}",
+            idempotent=False,
+        )
+
+    async def airport_city_search(self, request_body: dict) -> dict:
+        """
+        Search for airports and cities.
+        """
+        keyword = request_body.get("keyword")
+        sub_type = request_body.get("sub_type", "ANY")
+        if sub_type.upper() == "AIRPORT":
+            sub_type = Location.AIRPORT
+        elif sub_type.upper() == "CITY":
+            sub_type = Location.CITY
+        else:
+            sub_type = Location.ANY
+
+        response = await self._request(
+            "locations",
+            "GET",
+            "/v1/reference-data/locations",
+            params={"keyword": keyword, "subType": sub_type},
+        )
+        return response.data
+
+    async def get_flight_orders(
+        self,
+        flight_order_ids: list[str],
+        concurrency: int = AMADEUS_ORDER_FETCH_CONCURRENCY,
+        timeout: float = AMADEUS_ORDER_FETCH_TIMEOUT,
+    ) -> list[dict]:
+        """
+        Retrieve multiple flight orders concurrently.
+
+        At most ``concurrency`` orders are fetched at once and each fetch is
+        bounded by ``timeout`` seconds. An order that cannot be retrieved comes
+        back as ``{"id": ..., "error": {"status": ..., "detail": ...}}`` in its
+        position, so one failure does not fail the whole batch.
+
+        Every fetch also waits for the rate limiter, which bounds the batch to
+        about ``AMADEUS_RATE_LIMIT`` orders per second after the initial burst:
+        100 orders take at least 9 s at the default 10 per second.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(order_id: str) -> dict:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        self.get_flight_order(order_id), timeout
+                    )
+                except asyncio.TimeoutError:
+                    return _flight_order_error(
+                        order_id, 504, "Timed out retrieving the flight order"
+                    )
+                except UpstreamUnavailableError:
+                    return _flight_order_error(
+                        order_id, 503, "Flight order service is unavailable"
+                    )
+                except ResponseError as error:
+                    status_code = error.response.status_code or 502
+                    detail = (
+                        "Flight order not found"
+                        if status_code == 404
+                        else "Could not retrieve the flight order"
+                    )
+                    return _flight_order_error(order_id, status_code, detail)
+
+        return list(await asyncio.gather(*(fetch(i) for i in flight_order_ids)))
+
+
+amadeus_flight_service = AmadeusFlightService()
+async_amadeus_flight_service = AsyncAmadeusFlightService()
\ No newline at end of file
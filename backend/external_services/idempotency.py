@@ -0,0 +1,281 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from amadeus.client.errors import AuthenticationError, ClientError, NotFoundError
+from fastapi import HTTPException, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from crud.database import async_engine
+from crud.idempotency import (
+    claim_idempotency_key,
+    complete_idempotency_key,
+    fail_idempotency_key,
+    get_idempotency_key,
+    idempotency_key_age,
+    purge_idempotency_keys,
+    release_idempotency_key,
+)
+from external_services.cache import AsyncRedisCache, async_redis_cache
+from external_services.resilience import UpstreamUnavailableError
+from models.idempotency import IdempotencyStatus
+from utils.helpers import build_redis_key
+from utils.log_manager import get_app_logger
+from utils.metrics import metrics
+
+logger = get_app_logger(__name__)
+
+# Completed responses are replayed from Redis this long, then from Postgres
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 86400))
+# How long a duplicate waits for the first request before getting a 409
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", 60))
+# A claim this old belongs to a worker that died mid-request, so it is failed
+IDEMPOTENCY_CLAIM_TIMEOUT = int(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT", 300))
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", 0.25))
+# Completed and failed records are deleted this long after they were claimed
+IDEMPOTENCY_RETENTION = int(os.getenv("IDEMPOTENCY_RETENTION", 7 * 86400))
+IDEMPOTENCY_PURGE_INTERVAL = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", 3600))
+# Taken for one interval by the worker that runs the purge
+IDEMPOTENCY_PURGE_LOCK = "lock:idempotency_purge"
+
+
+class IdempotentCall:
+    """
+    Runs a request at most once per ``(user, Idempotency-Key)``.
+
+    The first request claims the key with an in-progress row in Postgres,
+    which is what makes the claim safe across workers. Its response is stored
+    on the row and in Redis; later requests with the same key get that
+    response back without the call being made again, and requests arriving
+    while it runs wait for it. Reusing a key for a different request body is
+    rejected with a 422.
+
+    If the call fails with one of the ``release_on`` errors, which mean it
+    was rejected and took no effect, the claim is released so the client can
+    retry with the same key. Any other failure (a timeout, a 5xx, a
+    cancellation) leaves it unknown whether the call took effect: the key is
+    kept as failed, the request gets a 502 and later ones with the key a 409,
+    until the outcome has been reconciled. A claim left in progress for
+    ``claim_timeout`` (its worker died mid-call) is failed the same way.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cache: AsyncRedisCache = async_redis_cache,
+        ttl: int = IDEMPOTENCY_TTL,
+        wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT,
+        claim_timeout: int = IDEMPOTENCY_CLAIM_TIMEOUT,
+        poll_interval: float = IDEMPOTENCY_POLL_INTERVAL,
+        release_on: tuple[type[BaseException], ...] = (ValueError,),
+    ):
+        self.name = name
+        self._release_on = release_on
+        self._cache = cache
+        self._ttl = ttl
+        self._wait_timeout = wait_timeout
+        self._claim_timeout = claim_timeout
+        self._poll_interval = poll_interval
+
+    def _cache_key(self, user_id: uuid.UUID, key: str) -> str:
+        return build_redis_key(
+            f"idempotency:{self.name}", {"user_id": str(user_id), "key": key}
+        )
+
+    async def run(
+        self,
+        session: AsyncSession,
+        user_id: uuid.UUID,
+        key: str,
+        request_hash: str,
+        fn: Callable[[], Awaitable[dict]],
+    ) -> tuple[dict, bool]:
+        """
+        Return ``fn()``'s response for this key and whether it was replayed
+        from an earlier request.
+        """
+        cache_key = self._cache_key(user_id, key)
+        stored = await self._cache.get(cache_key)
+        if stored is not None:
+            self._check_hash(stored["request_hash"], request_hash)
+            metrics.incr(
+                "idempotency_requests_total", name=self.name, result="replayed"
+            )
+            return stored["response"], True
+
+        response = await self._wait_or_claim(session, user_id, key, request_hash)
+        if response is not None:
+            await self._store(cache_key, request_hash, response)
+            metrics.incr(
+                "idempotency_requests_total", name=self.name, result="replayed"
+            )
+            return response, True
+
+        metrics.incr("idempotency_requests_total", name=self.name, result="new")
+        try:
+            response = await fn()
+        except self._release_on:
+            await session.rollback()
+            await release_idempotency_key(session, user_id, key)
+            raise
+        except BaseException as error:
+            await session.rollback()
+            await fail_idempotency_key(session, user_id, key)
+            metrics.incr("idempotency_requests_total", name=self.name, result="failed")
+            if isinstance(error, asyncio.CancelledError):
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=(
+                    "The request failed and may have taken effect. Do not retry "
+                    "it with another Idempotency-Key."
+                ),
+            ) from error
+        await complete_idempotency_key(session, user_id, key, response)
+        await self._store(cache_key, request_hash, response)
+        return response, False
+
+    async def _wait_or_claim(
+        self, session: AsyncSession, user_id: uuid.UUID, key: str, request_hash: str
+    ) -> dict | None:
+        """
+        Claim the key and return None, or return the response stored by the
+        request that holds it, waiting for that request to finish.
+        """
+        deadline = time.monotonic() + self._wait_timeout
+        waited = False
+        while True:
+            if await claim_idempotency_key(session, user_id, key, request_hash):
+                return None
+
+            record = await get_idempotency_key(session, user_id, key)
+            if record is not None:
+                # Keep the values readable once the read is ended below
+                session.expunge(record)
+            # End the read so the next poll sees newly committed rows
+            await session.rollback()
+            if record is None:
+                # Released since the claim attempt, try again
+                continue
+            self._check_hash(record.request_hash, request_hash)
+            if record.status == IdempotencyStatus.COMPLETED:
+                return record.response
+            if record.status == IdempotencyStatus.FAILED:
+                metrics.incr(
+                    "idempotency_requests_total", name=self.name, result="unknown"
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=(
+                        "A request with this Idempotency-Key failed and may have "
+                        "taken effect; its outcome has to be checked first."
+                    ),
+                )
+
+            if idempotency_key_age(record) > self._claim_timeout:
+                claimed_before = datetime.now(timezone.utc) - timedelta(
+                    seconds=self._claim_timeout
+                )
+                await fail_idempotency_key(session, user_id, key, claimed_before)
+                continue
+
+            if time.monotonic() >= deadline:
+                metrics.incr(
+                    "idempotency_requests_total", name=self.name, result="timeout"
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress.",
+                    headers={"Retry-After": str(max(int(self._poll_interval), 1))},
+                )
+            if not waited:
+                waited = True
+                metrics.incr(
+                    "idempotency_requests_total", name=self.name, result="waited"
+                )
+            await asyncio.sleep(self._poll_interval)
+
+    def _check_hash(self, stored_hash: str, request_hash: str):
+        if stored_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request.",
+            )
+
+    async def _store(self, cache_key: str, request_hash: str, response: dict):
+        await self._cache.set(
+            cache_key, {"request_hash": request_hash, "response": response}, self._ttl
+        )
+
+
+class IdempotencyKeyPurger:
+    """
+    Periodically deletes completed and failed idempotency records older than
+    ``retention``, so the table does not grow without bound. Once deleted, a
+    key can be used again. Like the booking snapshot refresher, every worker
+    runs one and a Redis lock held for ``interval`` lets one of them purge.
+    """
+
+    def __init__(
+        self,
+        retention: int = IDEMPOTENCY_RETENTION,
+        interval: int = IDEMPOTENCY_PURGE_INTERVAL,
+        cache: AsyncRedisCache = async_redis_cache,
+    ):
+        self.retention = timedelta(seconds=retention)
+        self.interval = interval
+        self._cache = cache
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._cache.set_if_absent(
+                    IDEMPOTENCY_PURGE_LOCK, 1, self.interval
+                ):
+                    await self.purge()
+            except Exception as e:
+                logger.warning(f"Idempotency key purge failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def purge(self) -> int:
+        """Delete the expired records. Returns how many were deleted."""
+        async with AsyncSession(async_engine) as session:
+            deleted = await purge_idempotency_keys(
+                session, datetime.now(timezone.utc) - self.retention
+            )
+        metrics.incr("idempotency_keys_purged_total", deleted)
+        return deleted
+
+
+# An Amadeus 4xx means the order was not created, and so does an
+# UpstreamUnavailableError: create_flight_order is not idempotent, so it is
+# never cut short once sent and that error is only raised before sending
+flight_order_idempotency = IdempotentCall(
+    "flight_order",
+    release_on=(
+        ClientError,
+        AuthenticationError,
+        NotFoundError,
+        ValueError,
+        UpstreamUnavailableError,
+    ),
+)
+
+idempotency_key_purger = IdempotencyKeyPurger()
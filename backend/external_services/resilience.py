@@ -0,0 +1,281 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+
+from utils.metrics import metrics
+
+# Consecutive upstream failures (5xx, 429, timeouts) that open a circuit
+AMADEUS_CIRCUIT_FAILURE_THRESHOLD = int(
+    os.getenv("AMADEUS_CIRCUIT_FAILURE_THRESHOLD", 5)
+)
+# How long an open circuit fails fast before letting a probe call through
+AMADEUS_CIRCUIT_RECOVERY_TIMEOUT = float(
+    os.getenv("AMADEUS_CIRCUIT_RECOVERY_TIMEOUT", 30)
+)
+AMADEUS_CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("AMADEUS_CIRCUIT_HALF_OPEN_CALLS", 1))
+# Requests per second to Amadeus from one worker process, so the API key's quota
+# divided by the number of workers
+AMADEUS_RATE_LIMIT = float(os.getenv("AMADEUS_RATE_LIMIT", 10))
+AMADEUS_RATE_LIMIT_BURST = int(os.getenv("AMADEUS_RATE_LIMIT_BURST", 10))
+# Floor the rate is never cut below after 429s
+AMADEUS_RATE_LIMIT_MIN = float(os.getenv("AMADEUS_RATE_LIMIT_MIN", 1))
+# Longest a call waits for a token before failing with a 503
+AMADEUS_RATE_LIMIT_MAX_WAIT = float(os.getenv("AMADEUS_RATE_LIMIT_MAX_WAIT", 5))
+# Attempts per idempotent call, the first one included
+AMADEUS_RETRY_ATTEMPTS = int(os.getenv("AMADEUS_RETRY_ATTEMPTS", 3))
+AMADEUS_RETRY_BASE_DELAY = float(os.getenv("AMADEUS_RETRY_BASE_DELAY", 0.2))
+AMADEUS_RETRY_MAX_DELAY = float(os.getenv("AMADEUS_RETRY_MAX_DELAY", 2))
+# Recent latencies kept per operation, and how many are needed before hedging
+AMADEUS_LATENCY_WINDOW = int(os.getenv("AMADEUS_LATENCY_WINDOW", 200))
+AMADEUS_LATENCY_MIN_SAMPLES = int(os.getenv("AMADEUS_LATENCY_MIN_SAMPLES", 20))
+# Hedges allowed per hedgeable call, e.g. 0.05 adds at most 5% upstream calls
+AMADEUS_HEDGE_BUDGET = float(os.getenv("AMADEUS_HEDGE_BUDGET", 0.05))
+
+
+class UpstreamUnavailableError(Exception):
+    """Amadeus is not called because it is failing or throttling us."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    """The request's deadline passed before Amadeus answered."""
+
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message, 0)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the wait before attempt ``n + 1`` is
+    drawn uniformly between 0 and ``min(max_delay, base_delay * 2 ** (n - 1))``,
+    so clients retrying together do not hit Amadeus in lockstep.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = AMADEUS_RETRY_ATTEMPTS,
+        base_delay: float = AMADEUS_RETRY_BASE_DELAY,
+        max_delay: float = AMADEUS_RETRY_MAX_DELAY,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (from 1)."""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+class CircuitBreaker:
+    """
+    Fails calls to an upstream operation fast while it keeps failing.
+
+    Closed, calls go through and ``failure_threshold`` consecutive failures
+    open the circuit. Open, calls raise ``CircuitOpenError`` without being
+    sent until ``recovery_timeout`` has passed. Half-open, up to
+    ``half_open_max_calls`` probe calls go through: a success closes the
+    circuit again and a failure re-opens it.
+
+    State is per worker process and exposed as the ``amadeus_circuit_state``
+    gauge (0 closed, 1 half-open, 2 open).
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    _STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = AMADEUS_CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = AMADEUS_CIRCUIT_RECOVERY_TIMEOUT,
+        half_open_max_calls: int = AMADEUS_CIRCUIT_HALF_OPEN_CALLS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        metrics.register_gauge(
+            "amadeus_circuit_state",
+            lambda: self._STATE_GAUGE[self.state],
+            operation=name,
+        )
+
+    def before_call(self):
+        """Raise ``CircuitOpenError`` unless a call may be sent now."""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+            if remaining > 0:
+                self._reject(remaining)
+            self._transition(self.HALF_OPEN)
+            self._probes = 0
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self._reject(self.recovery_timeout)
+            self._probes += 1
+
+    def release(self):
+        """The call ended without an outcome (cancelled), free its probe slot."""
+        if self.state == self.HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+
+    def record_success(self):
+        self._failures = 0
+        if self.state == self.HALF_OPEN:
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self._failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    def _reject(self, retry_after: float):
+        metrics.incr("amadeus_circuit_rejected_total", operation=self.name)
+        raise CircuitOpenError(
+            f"Circuit for Amadeus {self.name} calls is open", retry_after
+        )
+
+    def _transition(self, state: str):
+        self.state = state
+        metrics.incr("amadeus_circuit_transitions_total", operation=self.name, to=state)
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side token bucket for Amadeus calls that adapts to throttling.
+
+    Calls take a token, refilled at ``rate`` per second up to ``burst``. A 429
+    halves the rate (down to ``min_rate``) and, with a ``Retry-After`` header,
+    holds every call until it has passed; each success adds back about one
+    request per second per second, up to ``max_rate``. A call that would wait
+    longer than ``max_wait`` fails with ``UpstreamUnavailableError`` instead.
+    """
+
+    def __init__(
+        self,
+        max_rate: float = AMADEUS_RATE_LIMIT,
+        burst: int = AMADEUS_RATE_LIMIT_BURST,
+        min_rate: float = AMADEUS_RATE_LIMIT_MIN,
+        max_wait: float = AMADEUS_RATE_LIMIT_MAX_WAIT,
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max_rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+        metrics.register_gauge("amadeus_rate_limit_rps", lambda: self.rate)
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, max_wait: float | None = None):
+        """Wait for a token, at most ``max_wait`` (default ``self.max_wait``)."""
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    wait = (1 - self._tokens) / self.rate
+                if now + wait - started > max_wait:
+                    metrics.incr("amadeus_rate_limit_rejected_total")
+                    raise UpstreamUnavailableError("Amadeus rate limit reached", wait)
+                await asyncio.sleep(wait)
+        metrics.observe("amadeus_rate_limit_wait_seconds", time.monotonic() - started)
+
+    def record_success(self):
+        self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+    def record_throttled(self, retry_after: float | None = None):
+        metrics.incr("amadeus_throttled_total")
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = min(self._tokens, 0)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+class LatencyTracker:
+    """Latency percentiles over the last ``window`` successful calls."""
+
+    def __init__(
+        self,
+        window: int = AMADEUS_LATENCY_WINDOW,
+        min_samples: int = AMADEUS_LATENCY_MIN_SAMPLES,
+    ):
+        self._samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """The ``p``-th percentile (0-100), None until enough samples exist."""
+        if len(self._samples) < max(self.min_samples, 1):
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(len(ordered) * p / 100), len(ordered) - 1)
+        return ordered[index]
+
+
+class HedgeBudget:
+    """
+    Caps hedged calls to a ``ratio`` of the calls that could be hedged. Each
+    such call earns ``ratio`` of a hedge, saved up to ``max_saved``, so a
+    slow spell cannot double the load on Amadeus.
+    """
+
+    def __init__(self, ratio: float = AMADEUS_HEDGE_BUDGET, max_saved: float = 10):
+        self.ratio = ratio
+        self.max_saved = max_saved
+        self._saved = 0.0
+
+    def record_call(self):
+        self._saved = min(self.max_saved, self._saved + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._saved < 1:
+            return False
+        self._saved -= 1
+        return True
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds from a ``Retry-After`` header; HTTP dates are ignored."""
+    try:
+        return max(float(value), 0)
+    except (TypeError, ValueError):
+        return None
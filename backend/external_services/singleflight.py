@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from external_services.cache import (
+    CACHE_POLICIES,
+    AsyncRedisCache,
+    CachePolicy,
+    async_redis_cache,
+)
+from external_services.resilience import DeadlineExceededError
+from utils.deadline import request_deadline, time_remaining
+from utils.log_manager import get_app_logger
+from utils.metrics import metrics
+
+logger = get_app_logger(__name__)
+
+# How long a worker may hold the upstream call for a key before others give up waiting
+SINGLEFLIGHT_LOCK_TIMEOUT = int(os.getenv("SINGLEFLIGHT_LOCK_TIMEOUT", 30))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL", 0.05))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same cache key into one upstream call.
+
+    Inside a worker, callers for a key that is already in flight await the
+    same future. Across workers, the first caller takes a Redis lock next to
+    the cache key, runs the call and caches the result; callers in other
+    workers poll the cache until the result appears or the lock goes away.
+
+    Results are cached under the namespace's ``CachePolicy``: ``get_or_fetch``
+    serves stale entries immediately and refreshes them in the background.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        policy: CachePolicy,
+        cache: AsyncRedisCache = async_redis_cache,
+        lock_timeout: int = SINGLEFLIGHT_LOCK_TIMEOUT,
+        poll_interval: float = SINGLEFLIGHT_POLL_INTERVAL,
+    ):
+        self.name = name
+        self.policy = policy
+        self._cache = cache
+        self._lock_timeout = lock_timeout
+        self._poll_interval = poll_interval
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._refreshing: set[str] = set()
+        self._background_refreshes: set[asyncio.Task] = set()
+
+    async def get_or_fetch(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for ``key``, calling ``fn()`` on a miss.
+
+        A stale value (past the soft TTL) is returned right away and refreshed
+        in the background; only one refresh per key runs at a time.
+        """
+        value, is_stale = await self._cache.get_with_staleness(key)
+        if value is None:
+            metrics.incr("cache_requests_total", namespace=self.name, result="miss")
+            return await self.do(key, fn)
+
+        if is_stale:
+            metrics.incr("cache_requests_total", namespace=self.name, result="stale")
+            self._refresh_in_background(key, fn)
+        else:
+            metrics.incr("cache_requests_total", namespace=self.name, result="hit")
+        return value
+
+    def _refresh_in_background(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        if key in self._in_flight or key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                # Outlives the request that triggered it, so not bound by its deadline
+                with request_deadline(None):
+                    await self.do(key, fn)
+            except Exception as e:
+                logger.warning(f"Background refresh of {self.name} cache failed: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        task = asyncio.create_task(refresh())
+        self._background_refreshes.add(task)
+        task.add_done_callback(self._background_refreshes.discard)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the result of ``fn()`` for ``key``, running it at most once at
+        a time, and cache it under ``key``.
+
+        The call is shared by every caller for ``key``, so it runs in its own
+        task without a request deadline; each caller waits for it only until
+        its own deadline, and one caller giving up does not fail the others.
+        """
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            metrics.incr(
+                "singleflight_coalesced_total", name=self.name, scope="process"
+            )
+        else:
+            with request_deadline(None):
+                in_flight = asyncio.create_task(self._do_shared(key, fn))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(lambda task: self._done(key, task))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(in_flight), time_remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError() from None
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every caller gave up
+            task.exception()
+
+    async def _do_shared(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = f"lock:{key}"
+        owner = uuid.uuid4().hex
+        locked = await self._cache.set_if_absent(lock_key, owner, self._lock_timeout)
+        if not locked:
+            result = await self._wait_for_result(key, lock_key)
+            if result is not None:
+                metrics.incr(
+                    "singleflight_coalesced_total", name=self.name, scope="redis"
+                )
+                return result
+            # The other worker gave up or is too slow: call upstream, holding
+            # the lock only if it is free again
+            locked = await self._cache.set_if_absent(
+                lock_key, owner, self._lock_timeout
+            )
+
+        metrics.incr("singleflight_upstream_calls_total", name=self.name)
+        try:
+            result = await fn()
+            await self._cache.set_with_policy(key, result, self.policy)
+            return result
+        finally:
+            if locked:
+                await self._cache.delete_if_value(lock_key, owner)
+
+    async def _wait_for_result(self, key: str, lock_key: str):
+        """
+        Poll for the result another worker is computing. Returns None when the
+        lock was released (or expired) without a result, so the caller runs
+        the call itself. During a background refresh the stale value counts
+        as a result, since that caller does not need the new one.
+        """
+        deadline = time.monotonic() + self._lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self._poll_interval)
+            result, _ = await self._cache.get_with_staleness(key)
+            if result is not None:
+                return result
+            if await self._cache.get(lock_key) is None:
+                return (await self._cache.get_with_staleness(key))[0]
+        return None
+
+
+flight_search_singleflight = SingleFlight(
+    "flight_search", CACHE_POLICIES["flight_search"]
+)
+flight_search_post_singleflight = SingleFlight(
+    "flight_search_post", CACHE_POLICIES["flight_search"]
+)
+locations_singleflight = SingleFlight("locations", CACHE_POLICIES["locations"])
@@ -3,8 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 
 # FIXED IMPORTS ↓↓↓
 from routers import users
-from crud.database import init_db
+from crud.database import init_db, read_your_writes_middleware
 from routers import flights
+from routers import metrics
+from external_services.flight import close_http_client
+from external_services.cache import async_redis_cache, cache_invalidation_listener
+from external_services.booking_snapshots import (
+    BOOKING_SNAPSHOT_REFRESH_ENABLED,
+    booking_snapshot_refresher,
+)
+from external_services.idempotency import idempotency_key_purger
+from utils.deadline import deadline_middleware
 # FIXED IMPORTS ↑↑↑
 
 from dotenv import load_dotenv
@@ -22,16 +31,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.middleware("http")(read_your_writes_middleware)
+app.middleware("http")(deadline_middleware)
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
     init_db()
+    cache_invalidation_listener.start()
+    if BOOKING_SNAPSHOT_REFRESH_ENABLED:
+        booking_snapshot_refresher.start()
+    idempotency_key_purger.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await booking_snapshot_refresher.stop()
+    await idempotency_key_purger.stop()
+    await close_http_client()
+    await async_redis_cache.close()
+    cache_invalidation_listener.stop()
 
 
 app.include_router(users.router)
 app.include_router(flights.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, JSON, DateTime
+from sqlalchemy import Column, JSON, DateTime, Index
 import uuid
 from typing import TYPE_CHECKING
 from datetime import datetime, timezone
@@ -19,13 +19,18 @@ class BookingStatus:
 
 
 class Booking(SQLModel, table=True):
+    # Serves the per-user listing, which pages through bookings by created_at
+    __table_args__ = (
+        Index("ix_booking_user_id_created_at", "user_id", "created_at"),
+    )
+
     id: uuid.UUID = Field(
         default_factory=uuid.uuid4, primary_key=True, index=True, nullable=False
     )
     user_id: uuid.UUID = Field(foreign_key="userindb.id", nullable=False)
-    flight_order_id: str = Field(nullable=False)
+    flight_order_id: str = Field(nullable=False, unique=True, index=True)
 
-    status: str = Field(default=BookingStatus.CONFIRMED, nullable=False)
+    status: str = Field(default=BookingStatus.CONFIRMED, nullable=False, index=True)
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
     )
@@ -33,4 +38,12 @@ class Booking(SQLModel, table=True):
     user: "UserInDB" = Relationship(back_populates="bookings")
 
     amadeus_order_response: dict | None = Field(default=None, sa_column=Column(JSON))
+    # When amadeus_order_response was last synced with Amadeus
+    snapshot_updated_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
+    # Departure of the order's last flight, in local time at its airport
+    departure_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(), nullable=True)
+    )
     ticket_url: str | None = Field(default=None, nullable=True)
\ No newline at end of file
@@ -0,0 +1,30 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Column, DateTime
+from sqlmodel import Field, SQLModel
+
+
+class IdempotencyStatus:
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    # The call failed without telling whether it took effect (a timeout, a 5xx)
+    FAILED = "failed"
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """The outcome of a request sent with an ``Idempotency-Key`` header."""
+
+    user_id: uuid.UUID = Field(foreign_key="userindb.id", primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    # SHA-256 of the request body, a key may not be reused for another request
+    request_hash: str = Field(nullable=False)
+    status: str = Field(default=IdempotencyStatus.IN_PROGRESS, nullable=False)
+    response: dict | None = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(
+        sa_column=Column(
+            DateTime(timezone=True),
+            nullable=False,
+            default=lambda: datetime.now(timezone.utc),
+        )
+    )
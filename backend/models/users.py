@@ -12,8 +12,14 @@ class UserInDB(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, nullable=False)
     email: EmailStr = Field(index=True, unique=True)
     password: str
+    # Lookup half of the reset token, reset_token holds the verifier's hash
+    reset_token_selector: Optional[str] = Field(
+        default=None, nullable=True, unique=True, index=True
+    )
     reset_token: Optional[str] = Field(default=None, nullable=True)
     reset_token_expires: Optional[datetime] = Field(default=None, nullable=True)
+    # Bumped on password change/reset, which revokes every access token issued before
+    token_version: int = Field(default=0, nullable=False)
 
     # Relationship to bookings
     bookings: List["Booking"] = Relationship(back_populates="user")
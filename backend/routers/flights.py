@@ -1,34 +1,73 @@
 import logging
-from fastapi import APIRouter, HTTPException, Query, Depends, Path, Request
-from external_services.flight import amadeus_flight_service
+from fastapi import APIRouter, HTTPException, Header, Query, Depends, Path, Request, Response
+from external_services.flight import async_amadeus_flight_service
 from schemas.flights import (
     FlightSearchResponse,
     FlightPricingResponse,
 )
 from typing import Annotated
 from schemas.flight_search import (
-    FlightSearchRequestGet,
+    CitySearchRequestGet,
+    FareCalendarRequest,
+    FareCalendarResponse,
     FlightSearchRequestPost,
 )
 from schemas.flight_price_confirm import FlightOffer
 from schemas.flight_order import FlightOrderRequestBody
 from utils.security import get_current_user
+from models.bookings import BookingStatus
 from models.users import UserInDB
+from amadeus import ResponseError
 from amadeus.client.errors import NotFoundError, ClientError
-from external_services.cache import redis_cache
-from utils.helpers import build_redis_key
+from external_services.cache import AsyncRedisCache, async_redis_cache
+from external_services.singleflight import (
+    flight_search_post_singleflight,
+    flight_search_singleflight,
+    locations_singleflight,
+)
+from external_services.idempotency import flight_order_idempotency
+from external_services.resilience import (
+    DeadlineExceededError,
+    UpstreamUnavailableError,
+)
+from utils.helpers import build_redis_key, build_request_hash
 from schemas.locations import (
     AirportCitySearchRequest,
     AirportCitySearchResponse,
 )
-from models.bookings import Booking
-from crud.database import get_session
-from sqlmodel import Session, select
+from crud.bookings import (
+    create_booking,
+    get_booking_by_order_id,
+    list_user_bookings,
+    mark_booking_cancelled,
+    save_booking_snapshots,
+)
+from crud.database import get_read_session, get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils.metrics import metrics
+import asyncio
 import json
+import math
+import os
+from datetime import date, datetime, timedelta
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
+# Flight orders change rarely and are invalidated on create/cancel
+FLIGHT_ORDER_CACHE_TTL = int(os.getenv("FLIGHT_ORDER_CACHE_TTL", 300))
+BOOKINGS_PAGE_SIZE = int(os.getenv("BOOKINGS_PAGE_SIZE", 50))
+BOOKINGS_MAX_PAGE_SIZE = int(os.getenv("BOOKINGS_MAX_PAGE_SIZE", 200))
+# Fare calendar cells are cached as long as a search result stays fresh
+FARE_CALENDAR_CACHE_TTL = int(os.getenv("FARE_CALENDAR_CACHE_TTL", 300))
+FARE_CALENDAR_MAX_CELLS = int(os.getenv("FARE_CALENDAR_MAX_CELLS", 49))
+# Per-day searches run at once for one calendar
+FARE_CALENDAR_CONCURRENCY = int(os.getenv("FARE_CALENDAR_CONCURRENCY", 4))
+# City searches cover at most this many airports on each side
+CITY_SEARCH_MAX_AIRPORTS = int(os.getenv("CITY_SEARCH_MAX_AIRPORTS", 3))
+CITY_SEARCH_CONCURRENCY = int(os.getenv("CITY_SEARCH_CONCURRENCY", 4))
+CITY_AIRPORTS_CACHE_TTL = int(os.getenv("CITY_AIRPORTS_CACHE_TTL", 86400))
+
 router = APIRouter()
 
 
@@ -40,8 +79,11 @@ async def search_flights(request: FlightSearchRequestPost):
     try:
         request_body = request.model_dump()
 
-        # Make API call
-        response = amadeus_flight_service.search_flights(request_body)
+        # Equivalent searches share one cache entry and one upstream call
+        key = build_redis_key("flight_search_post", _canonical_search_post(request))
+        response = await flight_search_post_singleflight.get_or_fetch(
+            key, lambda: async_amadeus_flight_service.search_flights(request_body)
+        )
         return response
 
     except ClientError as e:
@@ -58,6 +100,9 @@ async def search_flights(request: FlightSearchRequestPost):
             detail=f"Amadeus API error: {e.response.body if hasattr(e.response, 'body') else str(e)}"
         )
 
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
+
     except Exception as e:
         # Also print any unknown error
         logger.exception("🔥 Unexpected flight search error")
@@ -67,28 +112,303 @@ async def search_flights(request: FlightSearchRequestPost):
         )
 
 
-@router.get("/shopping/flight-offers")
-async def search_flights2(request: Annotated[FlightSearchRequestGet, Query()]):
-    try:
-        request_body = request.model_dump(exclude_none=True)
+def _canonical_search_post(request: FlightSearchRequestPost) -> dict:
+    """
+    Normalise a POST search so equivalent requests hash the same: unset and
+    None fields are dropped and travelers are ordered by id.
+    """
+    canonical = request.model_dump(exclude_none=True)
+    canonical["travelers"] = sorted(canonical["travelers"], key=lambda t: t["id"])
+    return canonical
 
-        key = build_redis_key(request_body)
-        flight_data = redis_cache.get(key)
-        if flight_data:
-            return flight_data
 
-        response = amadeus_flight_service.search_flights_get(request_body)
-        redis_cache.set(key, response)
+@router.get("/shopping/flight-offers")
+async def search_flights2(request: Annotated[CitySearchRequestGet, Query()]):
+    """
+    Search for flights with the simple GET parameters.
 
-        return response
+    With ``expandCities``, a city code such as LON or NYC is expanded into its
+    airports and every origin/destination airport pair is searched, giving
+    one merged list of offers.
+    """
+    try:
+        request_body = request.model_dump(exclude_none=True, exclude={"expandCities"})
+        if request.expandCities:
+            # The merged result is cached too, on top of each pair's search
+            key = build_redis_key("flight_search_city", request_body)
+            return await flight_search_singleflight.get_or_fetch(
+                key, lambda: _search_city_pairs(request_body)
+            )
+        return await _search_flights_get(request_body)
     except ClientError:
         raise HTTPException(status_code=400, detail="Invalid request parameters")
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception:
         raise HTTPException(
             status_code=500, detail="An error occurred while searching for flights"
         )
 
 
+async def _search_flights_get(request_body: dict) -> list[dict]:
+    key = build_redis_key("flight_search", request_body)
+
+    # Stale results are served while a single refresh runs in the background,
+    # and identical concurrent misses share one upstream call
+    return await flight_search_singleflight.get_or_fetch(
+        key, lambda: async_amadeus_flight_service.search_flights_get(request_body)
+    )
+
+
+async def _city_airports(code: str) -> list[str]:
+    """
+    IATA codes of the airports of city ``code``, busiest first, or just
+    ``code`` when it is not a city with several airports. Uses the cached
+    ``/reference-data/locations`` lookup and caches the expansion too.
+    """
+    key = build_redis_key("city_airports", {"code": code})
+    airports = await async_redis_cache.get(key)
+    if airports is not None:
+        return airports
+
+    request_body = AirportCitySearchRequest(keyword=code).model_dump()
+    locations = await locations_singleflight.get_or_fetch(
+        build_redis_key("locations", request_body),
+        lambda: async_amadeus_flight_service.airport_city_search(request_body),
+    )
+    matches = sorted(
+        (
+            location
+            for location in locations or []
+            if location.get("subType") == "AIRPORT"
+            and location.get("address", {}).get("cityCode") == code
+        ),
+        key=lambda location: (
+            location.get("analytics", {}).get("travelers", {}).get("score", 0)
+        ),
+        reverse=True,
+    )
+    airports = [location["iataCode"] for location in matches] or [code]
+    airports = airports[:CITY_SEARCH_MAX_AIRPORTS]
+    await async_redis_cache.set(key, airports, CITY_AIRPORTS_CACHE_TTL)
+    return airports
+
+
+def _itinerary_fingerprint(offer: dict) -> tuple:
+    """Identifies the flights of an offer: carrier, flight number and times."""
+    return tuple(
+        (
+            segment.get("carrierCode"),
+            segment.get("number"),
+            segment.get("departure", {}).get("at"),
+            segment.get("arrival", {}).get("at"),
+        )
+        for itinerary in offer.get("itineraries", [])
+        for segment in itinerary.get("segments", [])
+    )
+
+
+def _offer_price(offer: dict) -> float:
+    price = offer.get("price", {})
+    return float(price.get("grandTotal") or price.get("total") or "inf")
+
+
+def _merge_offers(offer_lists: list[list[dict]], limit: int) -> list[dict]:
+    """
+    Merge the offers of several searches: the same flights found by two
+    searches are kept once at the lower price, offers are ranked by price
+    and renumbered so their ids stay unique.
+    """
+    cheapest = {}
+    for offers in offer_lists:
+        for offer in offers:
+            fingerprint = _itinerary_fingerprint(offer)
+            kept = cheapest.get(fingerprint)
+            if kept is None or _offer_price(offer) < _offer_price(kept):
+                cheapest[fingerprint] = offer
+    ranked = sorted(cheapest.values(), key=_offer_price)[:limit]
+    return [{**offer, "id": str(index)} for index, offer in enumerate(ranked, 1)]
+
+
+async def _search_city_pairs(
+    request_body: dict,
+    search=_search_flights_get,
+    city_airports=_city_airports,
+) -> list[dict]:
+    """
+    Search every origin/destination airport pair of a city search,
+    ``CITY_SEARCH_CONCURRENCY`` at a time, and merge the offers. Failed
+    pairs are left out unless all of them fail.
+    """
+    origins, destinations = await asyncio.gather(
+        city_airports(request_body["originLocationCode"]),
+        city_airports(request_body["destinationLocationCode"]),
+    )
+    pairs = [
+        (origin, destination)
+        for origin in origins
+        for destination in destinations
+        if origin != destination
+    ]
+    semaphore = asyncio.Semaphore(CITY_SEARCH_CONCURRENCY)
+
+    async def search_pair(origin: str, destination: str) -> list[dict]:
+        async with semaphore:
+            return await search(
+                {
+                    **request_body,
+                    "originLocationCode": origin,
+                    "destinationLocationCode": destination,
+                }
+            )
+
+    results = await asyncio.gather(
+        *(search_pair(*pair) for pair in pairs), return_exceptions=True
+    )
+    offer_lists = [
+        result for result in results if not isinstance(result, BaseException)
+    ]
+    if results and not offer_lists:
+        raise results[0]
+    metrics.incr("city_search_pairs_total", len(pairs))
+    return _merge_offers(
+        [offers or [] for offers in offer_lists], request_body.get("max", 5)
+    )
+
+
+@router.get("/shopping/fare-calendar", response_model=FareCalendarResponse)
+async def fare_calendar(request: Annotated[FareCalendarRequest, Query()]):
+    """
+    Cheapest price for each departure date within ``flexibleDays`` of
+    ``departureDate`` and, for return trips, each return date within
+    ``returnFlexibleDays`` of ``returnDate``.
+
+    Runs one flight search per date combination, sharing the cache of
+    ``GET /shopping/flight-offers``.
+    """
+    try:
+        cells = await _fare_calendar_cells(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ResponseError as e:
+        # Only 4xx rejections get here, see _fare_calendar_cells
+        raise HTTPException(status_code=400, detail=_parse_amadeus_client_error(e))
+    return {"currencyCode": request.currencyCode, "cells": cells}
+
+
+def _fare_calendar_searches(request: FareCalendarRequest) -> list[dict]:
+    """The per-day search bodies of a fare calendar, in calendar order."""
+    departure = date.fromisoformat(request.departureDate)
+    return_date = date.fromisoformat(request.returnDate) if request.returnDate else None
+    departures = [
+        departure + timedelta(days=offset)
+        for offset in range(-request.flexibleDays, request.flexibleDays + 1)
+    ]
+    returns = (
+        [
+            return_date + timedelta(days=offset)
+            for offset in range(
+                -request.returnFlexibleDays, request.returnFlexibleDays + 1
+            )
+        ]
+        if return_date
+        else [None]
+    )
+
+    base = request.model_dump(
+        exclude_none=True, exclude={"flexibleDays", "returnFlexibleDays"}
+    )
+    today = date.today()
+    searches = []
+    for departure_day in departures:
+        if departure_day < today:
+            continue
+        for return_day in returns:
+            if return_day is not None and return_day < departure_day:
+                continue
+            search = {**base, "departureDate": departure_day.isoformat()}
+            if return_day is not None:
+                search["returnDate"] = return_day.isoformat()
+            searches.append(search)
+
+    if len(searches) > FARE_CALENDAR_MAX_CELLS:
+        raise ValueError(
+            f"A fare calendar covers at most {FARE_CALENDAR_MAX_CELLS} date combinations"
+        )
+    return searches
+
+
+def _is_rejection(error: ResponseError) -> bool:
+    """
+    Whether Amadeus rejected the request with a 4xx other than 429 (a
+    throttled call may succeed later). ``NotFoundError`` and
+    ``AuthenticationError`` are not ``ClientError`` subclasses, so the status
+    is checked instead of the class.
+    """
+    status_code = getattr(error.response, "status_code", None) or 0
+    return 400 <= status_code < 500 and status_code != 429
+
+
+def _cheapest_offer_cell(search: dict, offers: list[dict]) -> dict:
+    cell = {
+        "departureDate": search["departureDate"],
+        "returnDate": search.get("returnDate"),
+        "price": None,
+        "offerId": None,
+    }
+    priced = [
+        (float(offer["price"].get("grandTotal") or offer["price"]["total"]), offer)
+        for offer in offers
+        if offer.get("price")
+    ]
+    if priced:
+        price, offer = min(priced, key=lambda item: item[0])
+        cell.update(price=price, offerId=offer.get("id"))
+    return cell
+
+
+async def _fare_calendar_cells(
+    request: FareCalendarRequest,
+    cache: AsyncRedisCache = async_redis_cache,
+    search=_search_flights_get,
+    concurrency: int = FARE_CALENDAR_CONCURRENCY,
+) -> list[dict]:
+    """
+    Build the calendar cells. Each cell is cached on its own key, so
+    overlapping windows only search the dates they do not share; the
+    missing days are searched at most ``concurrency`` at a time. A day whose
+    search fails upstream (a 5xx, a network error, Amadeus unavailable) gets
+    an empty cell that is not cached; a search Amadeus rejects with a 4xx
+    (429 aside) fails the whole calendar with its error.
+    """
+    searches = _fare_calendar_searches(request)
+    keys = [build_redis_key("fare_calendar", body) for body in searches]
+    cells = await cache.mget(keys)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fill(index: int) -> dict | None:
+        async with semaphore:
+            try:
+                offers = await search(searches[index])
+            except (ResponseError, UpstreamUnavailableError) as e:
+                if isinstance(e, ResponseError) and _is_rejection(e):
+                    raise
+                logger.warning(f"Fare calendar search failed: {e}")
+                cells[index] = _cheapest_offer_cell(searches[index], [])
+                return None
+        cells[index] = _cheapest_offer_cell(searches[index], offers or [])
+        return cells[index]
+
+    missing = [index for index, cell in enumerate(cells) if cell is None]
+    filled = await asyncio.gather(*(fill(index) for index in missing))
+    fresh = {keys[index]: cell for index, cell in zip(missing, filled) if cell}
+    if fresh:
+        await cache.mset(fresh, FARE_CALENDAR_CACHE_TTL)
+    metrics.incr("fare_calendar_cells_total", len(cells) - len(missing), result="hit")
+    metrics.incr("fare_calendar_cells_total", len(missing), result="miss")
+    return cells
+
+
 @router.post("/shopping/flight-offers/pricing", response_model=FlightPricingResponse)
 async def confirm_price(request: FlightOffer):
     """
@@ -99,11 +419,13 @@ async def confirm_price(request: FlightOffer):
     """
     try:
         request_body = request.model_dump()
-        response = amadeus_flight_service.confirm_price(request_body)
+        response = await async_amadeus_flight_service.confirm_price(request_body)
         return response
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Price confirmation failed: {str(e)}"
@@ -114,7 +436,10 @@ async def confirm_price(request: FlightOffer):
 async def flight_order(
     request: FlightOrderRequestBody,
     current_user: UserInDB = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
+    idempotency_key: Annotated[
+        str | None, Header(alias="Idempotency-Key", max_length=255)
+    ] = None,
 ):
     """
     Create a flight order from a pre-selected and price-confirmed flight offer.
@@ -123,29 +448,46 @@ async def flight_order(
     - The flight_offer must come from a RECENT pricing confirmation call
     - Flight offers expire quickly (typically within minutes)
     - Always call /shopping/flight-offers/pricing before this endpoint
+    - Send an Idempotency-Key header to make retries safe: a repeated key
+      returns the first order instead of creating another one
     """
     try:
         request_body = request.model_dump(by_alias=True)
 
-        response = amadeus_flight_service.create_flight_order(request_body)
+        if idempotency_key:
+            # Retries with the same key get the first order back instead of
+            # booking again
+            response, _ = await flight_order_idempotency.run(
+                session,
+                current_user.id,
+                idempotency_key,
+                build_request_hash(request_body),
+                lambda: async_amadeus_flight_service.create_flight_order(request_body),
+            )
+        else:
+            response = await async_amadeus_flight_service.create_flight_order(
+                request_body
+            )
 
         flight_order_id = response.get("id")
         if not flight_order_id:
             raise ValueError("Invalid response from booking service: missing order ID")
 
         try:
-            booking = Booking(user_id=current_user.id, flight_order_id=flight_order_id)
-            session.add(booking)
-            session.commit()
-            session.refresh(booking)
+            # Keep the order as returned by Amadeus so bookings can be listed
+            # without calling Amadeus again. A replayed order may already have
+            # its booking, or may be the retry of a request whose save failed.
+            if await get_booking_by_order_id(session, flight_order_id) is None:
+                await create_booking(session, current_user.id, response)
         except Exception:
-            session.rollback()
+            await session.rollback()
             # Booking created in Amadeus but DB save failed
             raise HTTPException(
                 status_code=500,
                 detail=("Booking failed, try again later."),
             )
 
+        await async_redis_cache.delete(_flight_order_key(flight_order_id))
         return response
 
     except ValueError as e:
@@ -160,6 +502,9 @@ async def flight_order(
         # Re-raise HTTPExceptions as-is
         raise
 
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
+
     except Exception:
         raise HTTPException(
             status_code=500,
@@ -171,7 +516,9 @@ async def flight_order(
 async def view_seat_map_get(flightorderId: Annotated[str, Query()]):
     try:
         # ✅ GOOD (Add the _get)
-        response = amadeus_flight_service.view_seat_map_get(flightorderId=flightorderId)
+        response = await async_amadeus_flight_service.view_seat_map_get(
+            flightorderId=flightorderId
+        )
         return response
 
     except ClientError as e:
@@ -181,13 +528,19 @@ async def view_seat_map_get(flightorderId: Annotated[str, Query()]):
              error_message = e.response.body
         raise HTTPException(status_code=400, detail=str(error_message))
 
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
+
     except Exception as e:
         logger.exception("Unexpected error in seatmap")
         raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
 @router.post("/shopping/seatmaps")
 async def view_seat_map_post(request: FlightOffer):
     request_body = request.model_dump()
-    response = amadeus_flight_service.view_seat_map_post(request_body)
+    try:
+        response = await async_amadeus_flight_service.view_seat_map_post(request_body)
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     return response
 
 
@@ -195,13 +548,30 @@ async def view_seat_map_post(request: FlightOffer):
 async def get_flight_order(
     flight_orderId: Annotated[str, Path()],
     current_user: UserInDB = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """Get flight order details by flight order ID"""
     try:
-        response = amadeus_flight_service.get_flight_order(flight_orderId)
+        booking = await get_booking_by_order_id(
+            read_session, flight_orderId, current_user.id
+        )
+        if booking is not None and booking.status == BookingStatus.CANCELLED:
+            # The snapshot is the order from before it was cancelled
+            raise HTTPException(status_code=404, detail="Flight order not found")
+        if booking is not None and booking.amadeus_order_response:
+            return booking.amadeus_order_response
+
+        response = await async_amadeus_flight_service.get_flight_order(flight_orderId)
+        if booking is not None:
+            await save_booking_snapshots(session, {booking.id: response})
         return response
+    except HTTPException:
+        raise
     except NotFoundError:
         raise HTTPException(status_code=404, detail="Flight order not found")
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception:
         raise HTTPException(
             status_code=500,
@@ -213,13 +583,22 @@ async def get_flight_order(
 async def cancel_flight_order_management(
     flight_orderId: Annotated[str, Path()],
     current_user: UserInDB = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
 ):
     """Cancel flight order by flight order ID"""
     try:
-        response = amadeus_flight_service.cancel_flight_order(flight_orderId)
+        response = await async_amadeus_flight_service.cancel_flight_order(flight_orderId)
+        await async_redis_cache.delete(_flight_order_key(flight_orderId))
+
+        booking = await get_booking_by_order_id(session, flight_orderId)
+        if booking is not None:
+            mark_booking_cancelled(session, booking)
+            await session.commit()
         return response.data
     except ClientError:
         raise HTTPException(status_code=400, detail="Invalid flight order ID")
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception:
         raise HTTPException(
             status_code=500, detail="An error occurred while deleting the flight order"
@@ -231,21 +610,36 @@ async def airport_city_search(request: Annotated[AirportCitySearchRequest, Query
     try:
         request_body = request.model_dump()
 
-        key = build_redis_key(request_body)
-        data = redis_cache.get(key)
-        if data:
-            return data
-
-        response = amadeus_flight_service.airport_city_search(request_body)
-        redis_cache.set(key, response)
+        key = build_redis_key("locations", request_body)
+        response = await locations_singleflight.get_or_fetch(
+            key, lambda: async_amadeus_flight_service.airport_city_search(request_body)
+        )
         return response
 
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception:
         raise HTTPException(
             status_code=500, detail="An error occurred while searching for a location"
         )
 
 
+def _upstream_unavailable(error: UpstreamUnavailableError) -> HTTPException:
+    """
+    503 for calls refused by the Amadeus circuit breaker or rate limiter, 504
+    when the request's deadline ran out.
+    """
+    if isinstance(error, DeadlineExceededError):
+        return HTTPException(
+            status_code=504, detail="The flight service did not respond in time."
+        )
+    return HTTPException(
+        status_code=503,
+        detail="The flight service is temporarily unavailable, please try again shortly.",
+        headers={"Retry-After": str(max(math.ceil(error.retry_after), 1))},
+    )
+
+
 def _parse_amadeus_client_error(error: ClientError) -> str:
     """
     Parse Amadeus ClientError and return user-friendly error message.
@@ -328,22 +722,86 @@ def _parse_amadeus_client_error(error: ClientError) -> str:
 
 @router.get("/bookings")
 async def get_user_bookings(
-    user: UserInDB = Depends(get_current_user), session: Session = Depends(get_session)
+    response: Response,
+    limit: Annotated[int, Query(ge=1, le=BOOKINGS_MAX_PAGE_SIZE)] = BOOKINGS_PAGE_SIZE,
+    cursor: Annotated[str | None, Query()] = None,
+    status: Annotated[str | None, Query()] = None,
+    created_from: Annotated[datetime | None, Query()] = None,
+    created_to: Annotated[datetime | None, Query()] = None,
+    user: UserInDB = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    try:
-        order_ids = session.exec(
-            select(Booking.flight_order_id).where(Booking.user_id == user.id)
-        ).all()
+    """
+    List the user's flight orders, oldest booking first, one page at a time.
 
-        key = build_redis_key({"order_ids": order_ids})
-        flight_orders = redis_cache.get(key)
-        if flight_orders:
-            return flight_orders
+    When there are more bookings, the ``X-Next-Cursor`` response header holds
+    the ``cursor`` to pass for the next page.
+    """
+    try:
+        bookings, next_cursor = await list_user_bookings(
+            read_session,
+            user.id,
+            limit,
+            cursor=cursor,
+            status=status,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-        flight_orders = amadeus_flight_service.get_flight_orders(order_ids)
+    try:
+        flight_orders = [booking.amadeus_order_response for booking in bookings]
 
-        redis_cache.set(key, flight_orders)
+        # Bookings made before snapshots were stored are fetched once and backfilled
+        missing = [index for index, order in enumerate(flight_orders) if not order]
+        if missing:
+            fetched = await _get_cached_flight_orders(
+                [bookings[index].flight_order_id for index in missing]
+            )
+            snapshots = {}
+            for index, order in zip(missing, fetched):
+                flight_orders[index] = order
+                if "error" not in order:
+                    snapshots[bookings[index].id] = order
+            await save_booking_snapshots(session, snapshots)
 
         return flight_orders
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _flight_order_key(order_id: str) -> str:
+    return build_redis_key("flight_order", {"id": order_id})
+
+
+async def _get_cached_flight_orders(
+    order_ids: list[str],
+    cache: AsyncRedisCache = async_redis_cache,
+    service=async_amadeus_flight_service,
+) -> list[dict]:
+    """
+    Return the flight orders for ``order_ids`` in order. Each order is cached
+    on its own key, so only the orders missing from the cache are fetched
+    from Amadeus; per-order failures are returned but never cached.
+    """
+    keys = [_flight_order_key(order_id) for order_id in order_ids]
+    flight_orders = await cache.mget(keys)
+
+    missing = [index for index, order in enumerate(flight_orders) if order is None]
+    if not missing:
+        return flight_orders
+
+    fetched = await service.get_flight_orders([order_ids[index] for index in missing])
+    to_cache = {}
+    for index, order in zip(missing, fetched):
+        flight_orders[index] = order
+        if "error" not in order:
+            to_cache[keys[index]] = order
+
+    if to_cache:
+        await cache.mset(to_cache, FLIGHT_ORDER_CACHE_TTL)
+    return flight_orders
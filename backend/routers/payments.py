@@ -2,7 +2,7 @@
 
 import os
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from backend.crud.database import get_session
 from backend.external_services.pesapal import pesapal_client
@@ -27,7 +27,7 @@ router = APIRouter(prefix="/payments", tags=["payments"])
 @router.post("/pesapal/initiate", response_model=PesapalPaymentResponse)
 async def initiate_pesapal_payment(
     payment_request: PesapalPaymentRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
 ):
     """
@@ -42,7 +42,7 @@ async def initiate_pesapal_payment(
     """
     print("Initiating Pesapal payment for booking:", payment_request.booking_id)
     # 1. Get the booking from database
-    booking = get_booking_by_id(session, payment_request.booking_id)
+    booking = await get_booking_by_id(session, payment_request.booking_id)
 
     if not booking:
         raise HTTPException(
@@ -129,7 +129,7 @@ async def initiate_pesapal_payment(
 async def pesapal_payment_callback(
     OrderTrackingId: str,
     OrderMerchantReference: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Handle Pesapal payment callback (user redirect after payment)
@@ -155,7 +155,7 @@ async def pesapal_payment_callback(
         )
 
         # 1. Get booking to update
-        booking = get_booking_by_id(session, original_booking_id)
+        booking = await get_booking_by_id(session, original_booking_id)
 
         if not booking:
             logger.error(f"Booking not found for ID: {original_booking_id}")
@@ -188,7 +188,7 @@ async def pesapal_payment_callback(
         )
 
         if payment_status_code == 1:  # COMPLETED
-            update_booking_status(session, str(booking.id), BookingStatus.PAID)
+            await update_booking_status(session, str(booking.id), BookingStatus.PAID)
 
             return {
                 "status": "success",
@@ -200,7 +200,7 @@ async def pesapal_payment_callback(
             }
 
         elif payment_status_code == 2:  # FAILED
-            update_booking_status(session, str(booking.id), BookingStatus.FAILED)
+            await update_booking_status(session, str(booking.id), BookingStatus.FAILED)
             return {
                 "status": "failed",
                 "message": f"Payment failed: {transaction_status.get('description', 'Unknown error')}",
@@ -208,7 +208,7 @@ async def pesapal_payment_callback(
             }
 
         elif payment_status_code == 3:  # REVERSED
-            update_booking_status(session, str(booking.id), BookingStatus.REVERSED)
+            await update_booking_status(session, str(booking.id), BookingStatus.REVERSED)
             return {
                 "status": "reversed",
                 "message": "Payment was reversed",
@@ -216,7 +216,7 @@ async def pesapal_payment_callback(
             }
 
         else:  # INVALID, PENDING, or unknown (status_code = 0)
-            update_booking_status(session, str(booking.id), BookingStatus.PENDING)
+            await update_booking_status(session, str(booking.id), BookingStatus.PENDING)
             error = transaction_status.get("error", {})
             if error and error.get("code") == "payment_details_not_found":
                 return {
@@ -233,7 +233,7 @@ async def pesapal_payment_callback(
             }
 
     except Exception as e:
-        update_booking_status(session, str(booking.id), BookingStatus.CANCELLED)
+        await update_booking_status(session, str(booking.id), BookingStatus.CANCELLED)
         print("Error processing Pesapal callback:", str(e))
         logger.error(f"Error processing Pesapal callback: {str(e)}")
         return {
@@ -248,7 +248,7 @@ async def pesapal_ipn_notification(
     OrderTrackingId: str | None = None,
     OrderMerchantReference: str | None = None,
     OrderNotificationType: str | None = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Handle Pesapal IPN (Instant Payment Notification)
@@ -287,7 +287,7 @@ async def pesapal_ipn_notification(
         )
 
         # 2. Get booking to update
-        booking = get_booking_by_id(session, original_booking_id)
+        booking = await get_booking_by_id(session, original_booking_id)
 
         if not booking:
             return {
@@ -301,21 +301,21 @@ async def pesapal_ipn_notification(
         payment_status_code = transaction_status.get("status_code")
 
         if payment_status_code == 1:  # COMPLETED
-            update_booking_status(session, str(booking.id), BookingStatus.PAID)
+            await update_booking_status(session, str(booking.id), BookingStatus.PAID)
         elif payment_status_code == 2:  # FAILED
-            update_booking_status(
+            await update_booking_status(
                 session,
                 str(booking.id),
                 BookingStatus.FAILED,
             )
         elif payment_status_code == 3:  # REVERSED
-            update_booking_status(
+            await update_booking_status(
                 session,
                 str(booking.id),
                 BookingStatus.REVERSED,
             )
         else:
-            update_booking_status(
+            await update_booking_status(
                 session,
                 str(booking.id),
                 BookingStatus.PENDING,
@@ -329,7 +329,7 @@ async def pesapal_ipn_notification(
         }
 
     except Exception:
-        update_booking_status(
+        await update_booking_status(
             session,
             str(booking.id),
             BookingStatus.CANCELLED,
@@ -2,7 +2,7 @@ from models.users import UserInDB
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Annotated
 from schemas.users import UserCreate, UserRead
-from crud.database import get_session
+from crud.database import get_read_session, get_session
 from crud.users import (
     get_user_by_email,
     create_user,
@@ -10,7 +10,7 @@ from crud.users import (
     verify_password_reset_token,
     update_password_with_token,
 )
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from external_services.email import send_email_async, send_password_reset_email
 from fastapi import BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
@@ -24,10 +24,12 @@ from schemas.auth import (
     VerifyResetTokenResponse,
 )
 from utils.security import (
+    access_token_claims,
     authenticate_user,
     create_access_token,
     get_current_user,
     hash_password,
+    invalidate_cached_user,
     verify_password,
 )
 from utils.log_manager import get_app_logger
@@ -42,15 +44,15 @@ logger = get_app_logger(__name__)
 async def register(
     background_tasks: BackgroundTasks,
     user_in: UserCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    user = get_user_by_email(session, user_in.email)
+    user = await get_user_by_email(session, user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
 
-    user = create_user(session, email=user_in.email, password=user_in.password)
+    user = await create_user(session, email=user_in.email, password=user_in.password)
 
     subject = "Welcome to Aero Bound Ventures!"
     recipients = [user_in.email]
@@ -66,9 +68,9 @@ async def login(
         OAuth2PasswordRequestForm,
         Depends(),
     ],
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ) -> Token:
-    user = authenticate_user(session, form_data.username, form_data.password)
+    user = await authenticate_user(session, form_data.username, form_data.password)
 
     if not user:
         raise HTTPException(
@@ -76,7 +78,7 @@ async def login(
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data=access_token_claims(user))
 
     return Token(access_token=access_token, token_type="bearer")
 
@@ -85,7 +87,7 @@ async def login(
 async def forgot_password(
     background_tasks: BackgroundTasks,
     request: ForgotPasswordRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Request a password reset. Sends an email with reset token if user exists.
@@ -93,7 +95,7 @@ async def forgot_password(
     """
     try:
         # Create reset token
-        reset_token = create_password_reset_token(session, request.email)
+        reset_token = await create_password_reset_token(session, request.email)
 
         # Send email only if user exists
         if reset_token:
@@ -121,12 +123,12 @@ async def forgot_password(
 @router.get("/verify-reset-token/{token}", response_model=VerifyResetTokenResponse)
 async def verify_reset_token(
     token: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """
     Verify if a password reset token is valid and not expired.
     """
-    user = verify_password_reset_token(session, token)
+    user = await verify_password_reset_token(session, token)
 
     if user:
         return VerifyResetTokenResponse(valid=True, message="Token is valid")
@@ -139,13 +141,15 @@ async def verify_reset_token(
 @router.post("/reset-password/", response_model=ResetPasswordResponse)
 async def reset_password(
     request: ResetPasswordRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Reset password using a valid reset token.
     """
     # Verify token and update password
-    success = update_password_with_token(session, request.token, request.new_password)
+    success = await update_password_with_token(
+        session, request.token, request.new_password
+    )
 
     if not success:
         raise HTTPException(
@@ -166,20 +170,28 @@ async def fetch_current_user(current_user: UserInDB = Depends(get_current_user))
 
 
 @router.post("/change-password/", response_model=ChangePasswordResponse)
-def change_password(
+async def change_password(
     password_data: ChangePasswordRequest,
     user: UserInDB = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    if not verify_password(password_data.old_password, user.password):
+    # The current user may come from the user cache or the read replica and
+    # carries no password hash, so load it from the primary
+    user = await session.get(UserInDB, user.id)
+    if not await verify_password(password_data.old_password, user.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Old password is incorrect"
         )
 
-    user.password = hash_password(password_data.new_password)
+    user.password = await hash_password(password_data.new_password)
+    # Revoke the access tokens issued with the old password
+    user.token_version += 1
     session.add(user)
-    session.commit()
+    await session.commit()
+    await invalidate_cached_user(user)
 
     return ChangePasswordResponse(
-        success=True, message="Password has been changed successfully"
-    )
\ No newline at end of file
+        success=True,
+        message="Password has been changed successfully",
+        access_token=create_access_token(data=access_token_claims(user)),
+    )
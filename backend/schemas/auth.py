@@ -29,7 +29,8 @@ class ResetPasswordResponse(BaseModel):
 
 
 class ChangePasswordResponse(ResetPasswordResponse):
-    pass
+    # Changing the password revokes earlier tokens, this one replaces them
+    access_token: str | None = None
 
 
 class ChangePasswordRequest(BaseModel):
@@ -88,4 +88,28 @@ class FlightSearchRequestGet(BaseModel):
     excludedAirlineCodes: Optional[str] = None
     nonStop: Optional[bool] = None
     currencyCode: str = Field(default="USD")
-    maxPrice: Optional[int] = None
\ No newline at end of file
+    maxPrice: Optional[int] = None
+
+
+class CitySearchRequestGet(FlightSearchRequestGet):
+    # Search every airport of city origin/destination codes such as LON or NYC
+    expandCities: bool = Field(default=False)
+
+
+class FareCalendarRequest(FlightSearchRequestGet):
+    # Days searched either side of departureDate (and of returnDate)
+    flexibleDays: int = Field(default=3, ge=0, le=7)
+    returnFlexibleDays: int = Field(default=0, ge=0, le=7)
+
+
+class FareCalendarCell(BaseModel):
+    departureDate: str
+    returnDate: Optional[str] = None
+    # None when there is no offer for these dates or the search failed
+    price: Optional[float] = None
+    offerId: Optional[str] = None
+
+
+class FareCalendarResponse(BaseModel):
+    currencyCode: str
+    cells: list[FareCalendarCell]
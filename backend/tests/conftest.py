@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+from sqlmodel import Session, SQLModel
+
+from backend.crud import users
+from backend.crud.database import engine
+from backend.external_services.cache import AsyncRedisCache
+from backend.main import app  # noqa: F401  (registers every model)
+
+
+class MemoryCache(AsyncRedisCache):
+    """In-memory stand-in for Redis, the codec and policies are the real ones."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, expiration_seconds=300):
+        self.data[key] = value
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def mset(self, items, expiration_seconds=300):
+        self.data.update(items)
+
+    async def set_if_absent(self, key, value, expiration_seconds=300):
+        return self.data.setdefault(key, value) is value
+
+    async def delete_if_value(self, key, value):
+        if key in self.data and self.data[key] == value:
+            del self.data[key]
+            return True
+        return False
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def memory_cache():
+    """Factory for tests that need more than one independent cache."""
+    return MemoryCache
+
+
+@pytest.fixture
+def cache(memory_cache):
+    return memory_cache()
+
+
+@pytest.fixture
+def user():
+    """A stored user, bookings and idempotency keys reference ``userindb``."""
+    SQLModel.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False) as session:
+        user = users.UserInDB(
+            email=f"{uuid.uuid4().hex}@example.com", password="not-a-hash"
+        )
+        session.add(user)
+        session.commit()
+    return user
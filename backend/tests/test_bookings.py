@@ -1,5 +1,21 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import httpx
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.crud import idempotency as idempotency_crud
+from backend.crud.database import async_engine, engine
+from backend.external_services import booking_snapshots, idempotency
+from backend.external_services.idempotency import IdempotentCall
+from backend import main
 from backend.main import app
+from backend.routers.flights import get_current_user
 
 client = TestClient(app)
 
@@ -8,3 +24,271 @@ def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Flight Booking API"}
+
+
+def test_metrics_require_the_metrics_token(monkeypatch):
+    monkeypatch.setattr(main.metrics, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(main.metrics, "METRICS_TOKEN", "scraper-token")
+    assert client.get("/metrics").status_code == 401
+    wrong = {"Authorization": "Bearer guess"}
+    assert client.get("/metrics", headers=wrong).status_code == 401
+    allowed = {"Authorization": "Bearer scraper-token"}
+    assert "counters" in client.get("/metrics", headers=allowed).json()
+
+
+def test_snapshot_refresher_syncs_stale_bookings_only(user):
+    Booking = booking_snapshots.Booking
+
+    offer = {
+        "price": {"grandTotal": "120.50"},
+        "itineraries": [{"segments": [{"departure": {"at": "2099-01-01T10:00:00"}}]}],
+    }
+
+    class StubService:
+        requested = []
+
+        async def get_flight_orders(self, order_ids):
+            self.requested.extend(order_ids)
+            return [
+                {"id": i, "error": {"status": 404, "detail": "Flight order not found"}}
+                if i.startswith("gone")
+                else {"id": i, "flightOffers": [offer]}
+                for i in order_ids
+            ]
+
+    suffix = uuid.uuid4().hex
+    user_id = user.id
+    with Session(engine) as session:
+        stale = Booking(user_id=user_id, flight_order_id=f"stale-{suffix}")
+        gone = Booking(
+            user_id=user_id,
+            flight_order_id=f"gone-{suffix}",
+            status="paid",
+            amadeus_order_response={"id": f"gone-{suffix}"},
+        )
+        departed = Booking(
+            user_id=user_id,
+            flight_order_id=f"departed-{suffix}",
+            snapshot_updated_at=datetime.now(timezone.utc) - timedelta(days=30),
+            departure_at=datetime(2020, 1, 1),
+        )
+        fresh = Booking(
+            user_id=user_id,
+            flight_order_id=f"fresh-{suffix}",
+            amadeus_order_response={"id": f"fresh-{suffix}"},
+            snapshot_updated_at=datetime.now(timezone.utc),
+        )
+        session.add_all([stale, gone, departed, fresh])
+        session.commit()
+        ids = {"stale": stale.id, "gone": gone.id}
+
+    service = StubService()
+    refresher = booking_snapshots.BookingSnapshotRefresher(
+        service=service, max_age=3600, batch_size=1000
+    )
+    asyncio.run(refresher.refresh_stale())
+
+    assert f"fresh-{suffix}" not in service.requested
+    assert f"departed-{suffix}" not in service.requested
+    with Session(engine) as session:
+        stale = session.get(Booking, ids["stale"])
+        assert stale.total_price == 120.5
+        assert stale.amadeus_order_response["id"] == f"stale-{suffix}"
+        assert stale.snapshot_updated_at is not None
+        assert stale.departure_at == datetime(2099, 1, 1, 10)
+        # A missing order leaves the booking as it was, only synced
+        gone = session.get(Booking, ids["gone"])
+        assert gone.status == "paid"
+        assert gone.amadeus_order_response == {"id": f"gone-{suffix}"}
+        assert gone.snapshot_updated_at is not None
+
+
+def test_bookings_are_paged_by_cursor(user):
+    Booking = booking_snapshots.Booking
+
+    user_id = user.id
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with Session(engine) as session:
+        for i in range(5):
+            order_id = f"order-{i}-{user_id.hex}"
+            session.add(
+                Booking(
+                    user_id=user_id,
+                    flight_order_id=order_id,
+                    status="cancelled" if i == 2 else "confirmed",
+                    created_at=started + timedelta(days=i),
+                    amadeus_order_response={"id": order_id},
+                    snapshot_updated_at=started,
+                )
+            )
+        session.commit()
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=user_id)
+    try:
+        pages, params = [], {"limit": 2}
+        while True:
+            response = client.get("/bookings", params=params)
+            assert response.status_code == 200
+            pages.append([order["id"].split("-")[1] for order in response.json()])
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+        filtered = client.get(
+            "/bookings",
+            params={"status": "confirmed", "created_from": "2026-01-04T00:00:00Z"},
+        )
+        invalid = client.get("/bookings", params={"cursor": "not-a-cursor"})
+        live = client.get(f"/booking/flight-orders/order-0-{user_id.hex}")
+        cancelled = client.get(f"/booking/flight-orders/order-2-{user_id.hex}")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert pages == [["0", "1"], ["3", "4"]]
+    assert [order["id"].split("-")[1] for order in filtered.json()] == ["3", "4"]
+    assert invalid.status_code == 400
+    assert live.json() == {"id": f"order-0-{user_id.hex}"}
+    # A cancelled booking's snapshot is not served as a live order
+    assert cancelled.status_code == 404
+
+
+def test_idempotency_key_runs_the_call_once(cache, user):
+    idempotent = IdempotentCall("test", cache=cache, poll_interval=0.01)
+    user_id, key = user.id, uuid.uuid4().hex
+    calls = []
+
+    async def create_order():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": f"order-{key}"}
+
+    async def request(request_hash="same"):
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            return await idempotent.run(
+                session, user_id, key, request_hash, create_order
+            )
+
+    async def retries():
+        concurrent = await asyncio.gather(request(), request())
+        # Replayed from Postgres once Redis has lost it
+        idempotent._cache.data.clear()
+        later = await request()
+        try:
+            await request("other")
+        except Exception as e:
+            mismatch = e
+        return concurrent, later, mismatch
+
+    concurrent, later, mismatch = asyncio.run(retries())
+
+    assert len(calls) == 1
+    assert [response for response, _ in concurrent] == [{"id": f"order-{key}"}] * 2
+    assert sorted(replayed for _, replayed in concurrent) == [False, True]
+    assert later == ({"id": f"order-{key}"}, True)
+    assert mismatch.status_code == 422
+
+
+def test_idempotency_key_is_kept_when_the_outcome_is_unknown(cache, user):
+    idempotent = IdempotentCall("test", cache=cache, poll_interval=0.01)
+    user_id, key = user.id, uuid.uuid4().hex
+    calls = []
+
+    async def create_order():
+        calls.append(1)
+        # The order may have been created before the response was lost
+        raise httpx.ReadTimeout("timed out")
+
+    async def request():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            try:
+                await idempotent.run(session, user_id, key, "same", create_order)
+            except HTTPException as e:
+                return e.status_code
+
+    async def retries():
+        return await request(), await request()
+
+    assert asyncio.run(retries()) == (502, 409)
+    assert len(calls) == 1
+
+
+def test_idempotency_key_is_released_when_the_order_was_not_sent(cache, user):
+    idempotent = idempotency.IdempotentCall(
+        "test",
+        cache=cache,
+        release_on=idempotency.flight_order_idempotency._release_on,
+    )
+    user_id, key = user.id, uuid.uuid4().hex
+    calls = []
+
+    async def create_order():
+        calls.append(1)
+        if len(calls) == 1:
+            # Refused by the rate limiter, nothing reached Amadeus
+            raise idempotency.UpstreamUnavailableError("Rate limit reached", 1)
+        return {"id": f"order-{key}"}
+
+    async def request():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            try:
+                return await idempotent.run(session, user_id, key, "same", create_order)
+            except idempotency.UpstreamUnavailableError:
+                return None
+
+    async def retries():
+        return await request(), await request()
+
+    assert asyncio.run(retries()) == (None, ({"id": f"order-{key}"}, False))
+
+
+def test_abandoned_idempotency_claims_fail_and_old_records_are_purged(cache, user):
+    IdempotencyKey = idempotency_crud.IdempotencyKey
+    user_id = user.id
+    long_ago = datetime.now(timezone.utc) - timedelta(days=30)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                IdempotencyKey(
+                    user_id=user_id,
+                    key="abandoned",
+                    request_hash="same",
+                    created_at=long_ago,
+                ),
+                IdempotencyKey(
+                    user_id=user_id,
+                    key="recent",
+                    request_hash="same",
+                    status="completed",
+                    response={},
+                ),
+            ]
+        )
+        session.commit()
+
+    idempotent = IdempotentCall("test", cache=cache, poll_interval=0.01)
+    calls = []
+
+    async def create_order():
+        calls.append(1)
+        return {"id": "order"}
+
+    async def retry_and_purge():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            try:
+                await idempotent.run(
+                    session, user_id, "abandoned", "same", create_order
+                )
+            except HTTPException as e:
+                conflict = e.status_code
+        return conflict, await idempotency.IdempotencyKeyPurger(retention=86400).purge()
+
+    conflict, purged = asyncio.run(retry_and_purge())
+
+    assert conflict == 409
+    assert calls == []
+    assert purged >= 1
+    with Session(engine) as session:
+        assert session.get(IdempotencyKey, (user_id, "abandoned")) is None
+        assert session.get(IdempotencyKey, (user_id, "recent")) is not None
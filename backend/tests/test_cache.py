@@ -0,0 +1,86 @@
+import asyncio
+
+from backend.external_services import cache as cache_module
+from backend.external_services.cache import AsyncRedisCache, CacheCodec, LocalCache
+
+
+def test_local_cache_evicts_least_recently_used_by_count_and_bytes():
+    cache = LocalCache(max_entries=2, max_bytes=100)
+    cache.set("a", 1, size=10, ttl_seconds=60)
+    cache.set("b", 2, size=10, ttl_seconds=60)
+    cache.get("a")
+    cache.set("c", 3, size=10, ttl_seconds=60)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+
+    cache.set("big", 4, size=95, ttl_seconds=60)
+    assert len(cache) == 1
+    assert cache.size_bytes == 95
+
+
+def test_local_cache_entries_expire():
+    cache = LocalCache(max_entries=10, max_bytes=100)
+    cache.set("a", 1, size=1, ttl_seconds=0)
+    assert cache.get("a") == (False, None)
+
+
+def test_codec_round_trips_and_reads_legacy_json():
+    codec = CacheCodec("json", "zlib", compress_threshold=10)
+    value = {"offers": [{"id": str(i), "price": "100.00"} for i in range(20)]}
+
+    data = codec.encode(value)
+    assert data[0] == 0x02  # json, zlib-compressed
+    assert codec.decode(data) == value
+    assert codec.decode(CacheCodec("json", None).encode([1])) == [1]
+    assert codec.decode(b'{"legacy": true}') == {"legacy": True}
+    assert codec.decode(b'"legacy string"') == "legacy string"
+
+
+def test_codec_sizes_are_uncompressed():
+    codec = CacheCodec("json", "zlib", compress_threshold=10)
+    value = {"offers": [{"id": str(i), "price": "100.00"} for i in range(20)]}
+    serialised = len(CacheCodec("json", None).encode(value)) - 1
+
+    data, size = codec.encode_sized(value)
+    assert len(data) < size == serialised
+    assert codec.decode_sized(data) == (value, serialised)
+
+
+def test_unreadable_entries_are_misses_and_deleted(monkeypatch):
+    class Pipeline:
+        def __init__(self, redis):
+            self.redis, self.replies = redis, []
+
+        def get(self, key):
+            self.replies.append(self.redis.data.get(key))
+
+        def pttl(self, key):
+            self.replies.append(60_000)
+
+        def delete(self, *keys):
+            self.redis.deleted.extend(keys)
+
+        async def execute(self):
+            return self.replies
+
+    class Redis:
+        data, deleted = {}, []
+
+        def pipeline(self, transaction=True):
+            return Pipeline(self)
+
+    zstd_entry = bytes([0x03]) + b"compressed elsewhere"
+    Redis.data = {
+        "zstd": zstd_entry,
+        "broken": bytes([0x02]) + b"not zlib",
+        "good": CacheCodec("json", None).encode({"ok": True}),
+    }
+    cache = AsyncRedisCache("localhost", 6379, codec=CacheCodec("json", None))
+    cache.r = Redis()
+    # A worker without the zstd extra reads an entry another one compressed
+    monkeypatch.setattr(cache_module, "zstandard", None)
+
+    values = asyncio.run(cache.mget(["zstd", "broken", "good"]))
+
+    assert values == [None, None, {"ok": True}]
+    assert sorted(Redis.deleted) == ["broken", "zstd"]
@@ -0,0 +1,72 @@
+import asyncio
+import sqlite3
+
+import jwt
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+from backend.crud import database
+from backend.crud.database import InstrumentedQueuePool, metrics
+
+
+def test_pool_records_checkouts_overflow_and_timeouts():
+    pool = InstrumentedQueuePool(
+        lambda: sqlite3.connect(":memory:"),
+        pool_size=1,
+        max_overflow=1,
+        timeout=0.01,
+        logging_name="test",
+    )
+    overflow_before = metrics.counter("db_pool_overflow_total", engine="test")
+
+    first = pool.connect()
+    second = pool.connect()
+    assert pool.checkedout() == 2
+    assert (
+        metrics.counter("db_pool_overflow_total", engine="test") == overflow_before + 1
+    )
+
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    assert metrics.counter("db_pool_checkout_timeouts_total", engine="test") >= 1
+
+    timing = metrics.snapshot()["timings"]["db_pool_checkout_seconds{engine=test}"]
+    assert timing["count"] >= 3
+
+    first.close()
+    second.close()
+    assert pool.checkedout() == 0
+
+
+def test_reads_stay_on_primary_after_own_write(monkeypatch, cache):
+    replica = create_async_engine("sqlite+aiosqlite://")
+    monkeypatch.setattr(database, "async_read_engine", replica)
+    monkeypatch.setattr(database, "async_redis_cache", cache)
+
+    def request(subject):
+        token = jwt.encode({"sub": subject}, "s" * 32, algorithm="HS256")
+        headers = [(b"authorization", f"Bearer {token}".encode())]
+        return Request({"type": "http", "headers": headers})
+
+    async def read_bind(subject):
+        sessions = database.get_read_session(request(subject))
+        session = await anext(sessions)
+        await sessions.aclose()
+        return session.bind
+
+    async def call_next(request):
+        return "response"
+
+    async def run():
+        assert await read_bind("writer@example.com") is replica
+
+        write = request("writer@example.com")
+        write.state.db_committed = True
+        await database.read_your_writes_middleware(write, call_next)
+
+        assert await read_bind("writer@example.com") is database.async_engine
+        assert await read_bind("other@example.com") is replica
+
+    asyncio.run(run())
@@ -0,0 +1,497 @@
+import asyncio
+import inspect
+import time
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from amadeus.client.errors import ClientError, NotFoundError, ServerError
+
+from backend.external_services import amadeus_auth
+from backend.external_services.amadeus_auth import AmadeusTokenManager
+from backend.external_services.cache import CachePolicy
+from backend.external_services.flight import (
+    AsyncAmadeusFlightService,
+    _to_amadeus_response,
+)
+from backend.external_services.resilience import (
+    AdaptiveRateLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgeBudget,
+    RetryPolicy,
+    UpstreamUnavailableError,
+)
+from backend.external_services import singleflight as singleflight_module
+from backend.external_services.singleflight import SingleFlight
+from backend.routers.flights import (
+    _canonical_search_post,
+    _fare_calendar_cells,
+    _get_cached_flight_orders,
+    _search_city_pairs,
+)
+from backend.schemas.flight_search import FareCalendarRequest, FlightSearchRequestPost
+from backend.utils.helpers import build_redis_key
+
+
+def make_service(handler, cache) -> AsyncAmadeusFlightService:
+    async def transport_handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/v1/security/oauth2/token":
+            return httpx.Response(200, json={"access_token": "t", "expires_in": 1799})
+        response = handler(request)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    client = httpx.AsyncClient(
+        base_url="https://amadeus.test",
+        transport=httpx.MockTransport(transport_handler),
+    )
+    service = AsyncAmadeusFlightService(client=client)
+    service.token_manager = AmadeusTokenManager(
+        service._fetch_access_token, cache=cache
+    )
+    return service
+
+
+def test_search_flights_get_returns_data(cache):
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer t"
+        assert request.url.params["originLocationCode"] == "NBO"
+        return httpx.Response(200, json={"data": [{"id": "1"}]})
+
+    service = make_service(handler, cache)
+    response = asyncio.run(service.search_flights_get({"originLocationCode": "NBO"}))
+    assert response == [{"id": "1"}]
+
+
+def test_errors_are_raised_as_sdk_errors(cache):
+    def handler(request):
+        if request.url.path.endswith("/missing"):
+            return httpx.Response(404, json={"errors": [{"code": 1797}]})
+        return httpx.Response(400, json={"errors": [{"code": 477}]})
+
+    service = make_service(handler, cache)
+    with pytest.raises(NotFoundError):
+        asyncio.run(service.get_flight_order("missing"))
+    with pytest.raises(ClientError) as error:
+        asyncio.run(service.search_flights_get({}))
+    assert error.value.response.result["errors"][0]["code"] == 477
+
+
+def test_token_manager_fetches_once_for_concurrent_callers(cache):
+    fetches = []
+
+    async def fetch_token():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return {"access_token": "t", "expires_in": 1799}
+
+    async def cold_start():
+        manager = AmadeusTokenManager(fetch_token, cache=cache)
+        tokens = await asyncio.gather(*(manager.get_token() for _ in range(200)))
+        return set(tokens)
+
+    assert asyncio.run(cold_start()) == {"t"}
+    assert len(fetches) == 1
+
+
+def test_locks_held_by_another_worker_are_not_released(cache, monkeypatch):
+    monkeypatch.setattr(amadeus_auth, "AMADEUS_TOKEN_LOCK_TIMEOUT", 0.2)
+
+    async def fetch_token():
+        return {"access_token": "t", "expires_in": 1799}
+
+    async def search():
+        return [{"id": "1"}]
+
+    async def past_stuck_workers():
+        cache.data["lock:amadeus:access-token"] = "other-worker"
+        token = await AmadeusTokenManager(fetch_token, cache=cache).get_token()
+        cache.data["lock:key"] = "other-worker"
+        singleflight = SingleFlight(
+            "test", CachePolicy(60, 600), cache=cache, lock_timeout=0.2
+        )
+        return token, await singleflight.do("key", search)
+
+    # The waits time out and the calls go ahead, leaving the locks they never held
+    assert asyncio.run(past_stuck_workers()) == ("t", [{"id": "1"}])
+    assert cache.data["lock:amadeus:access-token"] == "other-worker"
+    assert cache.data["lock:key"] == "other-worker"
+
+
+def test_get_flight_orders_returns_error_entries_for_failed_orders(cache):
+    def handler(request):
+        order_id = request.url.path.rsplit("/", 1)[-1]
+        if order_id == "missing":
+            return httpx.Response(404, json={"errors": [{"status": 404}]})
+        return httpx.Response(200, json={"data": {"id": order_id}})
+
+    service = make_service(handler, cache)
+    orders = asyncio.run(service.get_flight_orders(["a", "missing", "b"]))
+    assert orders[0] == {"id": "a"}
+    assert orders[1]["error"]["status"] == 404
+    assert orders[2] == {"id": "b"}
+
+
+def test_singleflight_coalesces_identical_calls(cache):
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [{"id": "1"}]
+
+    async def burst():
+        singleflight = SingleFlight("test", CachePolicy(60, 600), cache=cache)
+        return await asyncio.gather(
+            *(singleflight.do("key", search) for _ in range(50))
+        )
+
+    results = asyncio.run(burst())
+    assert len(calls) == 1
+    assert all(result == [{"id": "1"}] for result in results)
+
+
+def test_singleflight_waiters_outlive_the_callers_deadline(cache):
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return [{"id": "1"}]
+
+    async def impatient(singleflight):
+        with singleflight_module.request_deadline(0.02):
+            try:
+                return await singleflight.do("key", search)
+            except singleflight_module.DeadlineExceededError as e:
+                return e
+
+    async def burst():
+        singleflight = SingleFlight("test", CachePolicy(60, 600), cache=cache)
+        return await asyncio.gather(
+            impatient(singleflight), singleflight.do("key", search)
+        )
+
+    leader, waiter = asyncio.run(burst())
+    assert isinstance(leader, singleflight_module.DeadlineExceededError)
+    assert waiter == [{"id": "1"}]
+    assert len(calls) == 1
+
+
+def test_stale_entries_are_served_while_refreshing_once(cache):
+    calls = []
+
+    async def search():
+        calls.append(1)
+        return [{"id": "new"}]
+
+    async def read_stale():
+        await cache.set_with_policy("key", [{"id": "old"}], CachePolicy(0, 600))
+        singleflight = SingleFlight("test", CachePolicy(60, 600), cache=cache)
+        results = [await singleflight.get_or_fetch("key", search) for _ in range(5)]
+        await asyncio.gather(*singleflight._background_refreshes)
+        return results, await singleflight.get_or_fetch("key", search)
+
+    stale_results, refreshed = asyncio.run(read_stale())
+    assert all(result == [{"id": "old"}] for result in stale_results)
+    assert refreshed == [{"id": "new"}]
+    assert len(calls) == 1
+
+
+def test_equivalent_post_searches_hash_the_same():
+    origin = {
+        "id": "1",
+        "originLocationCode": "NBO",
+        "destinationLocationCode": "LHR",
+        "departureDateTimeRange": {"date": "2026-12-01"},
+    }
+    first = FlightSearchRequestPost(
+        currencyCode="USD",
+        originDestinations=[origin],
+        travelers=[
+            {"id": "1", "travelerType": "ADULT"},
+            {"id": "2", "travelerType": "CHILD"},
+        ],
+        sources=["GDS"],
+    )
+    second = FlightSearchRequestPost.model_validate(
+        {
+            "sources": ["GDS"],
+            "travelers": [
+                {"travelerType": "CHILD", "id": "2", "associatedAdultId": None},
+                {"id": "1", "travelerType": "ADULT"},
+            ],
+            "originDestinations": [origin],
+            "currencyCode": "USD",
+            "searchCriteria": None,
+        }
+    )
+    first_key = build_redis_key("flight_search_post", _canonical_search_post(first))
+    second_key = build_redis_key("flight_search_post", _canonical_search_post(second))
+    assert first_key == second_key
+    assert len(first_key) == len("flight_search_post:v1:") + 64
+
+
+def test_bookings_fetch_only_orders_missing_from_cache(cache, memory_cache):
+    requested = []
+
+    def handler(request):
+        order_id = request.url.path.rsplit("/", 1)[-1]
+        requested.append(order_id)
+        if order_id == "missing":
+            return httpx.Response(404, json={"errors": [{"status": 404}]})
+        return httpx.Response(200, json={"data": {"id": order_id}})
+
+    service = make_service(handler, memory_cache())
+
+    async def bookings(order_ids):
+        return await _get_cached_flight_orders(order_ids, cache=cache, service=service)
+
+    orders = asyncio.run(bookings(["a", "b"]))
+    assert orders == [{"id": "a"}, {"id": "b"}]
+
+    requested.clear()
+    orders = asyncio.run(bookings(["a", "b", "c", "missing"]))
+    assert [order["id"] for order in orders] == ["a", "b", "c", "missing"]
+    assert orders[3]["error"]["status"] == 404
+    assert sorted(requested) == ["c", "missing"]
+    assert len(cache.data) == 3
+
+
+def test_circuit_opens_after_failures_and_closes_after_a_probe(cache):
+    statuses = [500, 500, 200]
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(statuses.pop(0), json={"data": [{"id": "1"}]})
+
+    service = make_service(handler, cache)
+    breaker = CircuitBreaker("search", failure_threshold=2, recovery_timeout=0.05)
+    service.breakers["search"] = breaker
+    service.retry_policies["search"] = RetryPolicy(1)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(ServerError):
+                await service.search_flights_get({})
+        # Open: fails fast without calling Amadeus
+        with pytest.raises(CircuitOpenError):
+            await service.search_flights_get({})
+        assert len(calls) == 2
+
+        await asyncio.sleep(0.06)
+        return await service.search_flights_get({})
+
+    assert asyncio.run(scenario()) == [{"id": "1"}]
+    assert breaker.state == CircuitBreaker.CLOSED
+    # The locations circuit is unaffected
+    assert service.breakers["locations"].state == CircuitBreaker.CLOSED
+
+
+def test_rate_limiter_backs_off_on_429(cache):
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "1"}, json={"errors": []})
+
+    service = make_service(handler, cache)
+    service.rate_limiter = AdaptiveRateLimiter(max_rate=8, burst=8, max_wait=0.5)
+    service.retry_policies["search"] = RetryPolicy(1)
+
+    async def throttled():
+        with pytest.raises(ClientError):
+            await service.search_flights_get({})
+        # Held back until Retry-After has passed, longer than max_wait
+        with pytest.raises(UpstreamUnavailableError):
+            await service.search_flights_get({})
+
+    asyncio.run(throttled())
+    assert service.rate_limiter.rate == 4
+
+
+def test_idempotent_calls_are_retried_within_the_deadline(cache):
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) == 1:
+            return httpx.Response(503, json={"errors": []})
+        return httpx.Response(200, json={"data": {"id": "1"}})
+
+    service = make_service(handler, cache)
+    service.retry_policies["orders"] = RetryPolicy(3, base_delay=0.01)
+    assert asyncio.run(service.get_flight_order("1")) == {"id": "1"}
+    assert calls == ["GET", "GET"]
+
+    # Creating an order is never retried
+    calls.clear()
+    with pytest.raises(ServerError):
+        asyncio.run(
+            service.create_flight_order(
+                {"flight_offer": {"id": "1"}, "travelers": [{}]}
+            )
+        )
+    assert calls == ["POST"]
+
+
+def test_requests_past_their_deadline_are_not_sent_upstream():
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    # Fails before any Amadeus call, the token endpoint included
+    response = TestClient(app).get(
+        "/shopping/seatmaps",
+        params={"flightorderId": "1"},
+        headers={"X-Request-Timeout": "0.000001"},
+    )
+    assert response.status_code == 504
+
+
+def test_slow_reads_are_hedged_within_budget(cache):
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={"data": [{"id": "slow"}]})
+        return httpx.Response(200, json={"data": [{"id": "hedge"}]})
+
+    service = make_service(handler, cache)
+    service.hedged_operations = {"locations"}
+    service.hedge_budget = HedgeBudget(ratio=1, max_saved=1)
+    for _ in range(service.latency["locations"].min_samples):
+        service.latency["locations"].record(0.01)
+
+    async def search():
+        started = time.perf_counter()
+        response = await service.airport_city_search({"keyword": "NBO"})
+        return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(search())
+    assert response == [{"id": "hedge"}]
+    assert elapsed < 0.5
+    assert len(calls) == 2
+
+    # Without budget left the slow call is waited for
+    service.hedge_budget = HedgeBudget(ratio=0)
+    calls.clear()
+    response, _ = asyncio.run(search())
+    assert response == [{"id": "slow"}]
+    assert len(calls) == 1
+
+
+def test_fare_calendar_searches_each_day_once(cache):
+    searched = []
+
+    async def search(body):
+        searched.append(body["departureDate"])
+        day = int(body["departureDate"][-2:])
+        return [
+            {"id": f"{day}-a", "price": {"grandTotal": str(100 + day)}},
+            {"id": f"{day}-b", "price": {"grandTotal": str(90 + day)}},
+        ]
+
+    start = date.today() + timedelta(days=30)
+
+    def calendar(center: date):
+        request = FareCalendarRequest(
+            originLocationCode="NBO",
+            destinationLocationCode="LHR",
+            departureDate=center.isoformat(),
+            flexibleDays=1,
+        )
+        return asyncio.run(_fare_calendar_cells(request, cache=cache, search=search))
+
+    cells = calendar(start)
+    assert [cell["departureDate"] for cell in cells] == [
+        (start + timedelta(days=offset)).isoformat() for offset in (-1, 0, 1)
+    ]
+    assert cells[1]["offerId"] == f"{start.day}-b"
+    assert cells[1]["price"] == 90 + start.day
+
+    # The next window shares two days with the first one
+    searched.clear()
+    calendar(start + timedelta(days=1))
+    assert searched == [(start + timedelta(days=2)).isoformat()]
+
+
+def test_fare_calendar_degrades_only_on_upstream_failures(memory_cache):
+    def failing_search(error_class, status_code):
+        async def search(body):
+            if body["departureDate"] == start.isoformat():
+                raise error_class(_to_amadeus_response(httpx.Response(status_code)))
+            return [{"id": "1", "price": {"grandTotal": "100"}}]
+
+        return search
+
+    start = date.today() + timedelta(days=30)
+    request = FareCalendarRequest(
+        originLocationCode="NBO",
+        destinationLocationCode="LHR",
+        departureDate=start.isoformat(),
+        flexibleDays=1,
+    )
+
+    cells = asyncio.run(
+        _fare_calendar_cells(
+            request, cache=memory_cache(), search=failing_search(ServerError, 500)
+        )
+    )
+    assert [cell["price"] for cell in cells] == [100, None, 100]
+
+    throttled = asyncio.run(
+        _fare_calendar_cells(
+            request, cache=memory_cache(), search=failing_search(ClientError, 429)
+        )
+    )
+    assert [cell["price"] for cell in throttled] == [100, None, 100]
+
+    for error_class, status_code in ((ClientError, 400), (NotFoundError, 404)):
+        with pytest.raises(error_class):
+            asyncio.run(
+                _fare_calendar_cells(
+                    request,
+                    cache=memory_cache(),
+                    search=failing_search(error_class, status_code),
+                )
+            )
+
+
+def test_city_search_merges_airport_pairs_without_duplicates():
+    def offer(offer_id, price, flight_number):
+        segment = {
+            "carrierCode": "BA",
+            "number": flight_number,
+            "departure": {"at": "2026-12-01T10:00:00"},
+            "arrival": {"at": "2026-12-01T18:00:00"},
+        }
+        return {
+            "id": offer_id,
+            "itineraries": [{"segments": [segment]}],
+            "price": {"grandTotal": price},
+        }
+
+    async def city_airports(code):
+        return {"LON": ["LHR", "LGW"]}.get(code, [code])
+
+    async def search(body):
+        if body["originLocationCode"] == "LHR":
+            # The same flight sold cheaper through the other search
+            return [offer("1", "500.00", "65"), offer("2", "450.00", "64")]
+        return [offer("1", "480.00", "65"), offer("2", "700.00", "2245")]
+
+    offers = asyncio.run(
+        _search_city_pairs(
+            {"originLocationCode": "LON", "destinationLocationCode": "NBO", "max": 5},
+            search=search,
+            city_airports=city_airports,
+        )
+    )
+    assert [(o["id"], o["price"]["grandTotal"]) for o in offers] == [
+        ("1", "450.00"),
+        ("2", "480.00"),
+        ("3", "700.00"),
+    ]
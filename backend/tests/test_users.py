@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.crud import users
+from backend.crud.database import async_engine, engine
+from backend.main import app  # noqa: F401  (registers every model)
+from backend.utils import security
+from backend.utils.security import PasswordHasher
+
+
+def test_reset_tokens_are_looked_up_by_selector():
+    SQLModel.metadata.create_all(engine)
+
+    async def run():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            user = await users.create_user(session, "reset@example.com", "password")
+            token = await users.create_password_reset_token(session, user.email)
+            selector, verifier = token.split(".")
+            assert user.reset_token_selector == selector
+            assert verifier not in user.reset_token
+
+            assert (
+                await users.verify_password_reset_token(session, token)
+            ).id == user.id
+            assert (
+                await users.verify_password_reset_token(session, selector + ".x")
+                is None
+            )
+
+            # Tokens issued before selectors are still accepted until they expire
+            user.reset_token_selector = None
+            user.reset_token = await users.hash_password("legacy-token")
+            session.add(user)
+            await session.commit()
+            legacy = await users.verify_password_reset_token(session, "legacy-token")
+            assert legacy.id == user.id
+
+            user.reset_token_expires = datetime.now() - timedelta(minutes=1)
+            session.add(user)
+            await session.commit()
+            assert (
+                await users.verify_password_reset_token(session, "legacy-token") is None
+            )
+
+    asyncio.run(run())
+
+
+def test_password_hasher_rejects_work_beyond_max_pending():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.create_task(hasher.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as error:
+            await hasher.run(release.wait)
+        assert error.value.status_code == 503
+
+        release.set()
+        assert await first is True
+        assert hasher.pending == 0
+
+    asyncio.run(run())
+
+
+def test_current_user_is_served_from_cache_until_version_changes(monkeypatch, cache):
+    monkeypatch.setattr(security, "async_redis_cache", cache)
+    SQLModel.metadata.create_all(engine)
+
+    async def run():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            user = await users.create_user(session, "cached@example.com", "password")
+            claims = security.access_token_claims(user)
+
+            assert (await security._load_user(session, claims)).id == user.id
+            # Served from the cache: no session needed
+            cached = await security._load_user(None, claims)
+            assert cached.id == user.id and cached.password is None
+
+            stale = dict(await cache.get(security._user_cache_key(user.id)))
+            user.token_version += 1
+            session.add(user)
+            await session.commit()
+            await security.invalidate_cached_user(user)
+
+            class LaggingReplica:
+                async def get(self, model, user_id):
+                    return users.UserInDB(id=user_id, email=user.email, token_version=0)
+
+            # Re-cached from a replica that has not seen the bump yet
+            await cache.set(security._user_cache_key(user.id), stale)
+            assert await security._load_user(LaggingReplica(), claims) is None
+            new_claims = security.access_token_claims(user)
+            loaded = await security._load_user(LaggingReplica(), new_claims)
+            assert loaded.id == user.id and loaded.token_version == 1
+
+    asyncio.run(run())
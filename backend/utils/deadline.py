@@ -0,0 +1,60 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import Request
+
+# Overall time budget of an API request, upstream calls and their retries included
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 30))
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+def time_remaining() -> float | None:
+    """Seconds left before the current request's deadline, None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def request_deadline(seconds: float | None):
+    """
+    Run the block with a deadline ``seconds`` from now, or none at all for
+    None. A deadline already in place is only ever shortened.
+    """
+    if seconds is None:
+        deadline = None
+    else:
+        deadline = time.monotonic() + seconds
+        current = _deadline.get()
+        if current is not None:
+            deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _client_timeout(request: Request) -> float | None:
+    try:
+        return float(request.headers["X-Request-Timeout"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def deadline_middleware(request: Request, call_next):
+    """
+    Give every request a deadline of ``REQUEST_DEADLINE_SECONDS``, shortened
+    by an ``X-Request-Timeout`` header (seconds) from clients that give up
+    sooner.
+    """
+    seconds = REQUEST_DEADLINE_SECONDS
+    client_timeout = _client_timeout(request)
+    if client_timeout is not None and client_timeout > 0:
+        seconds = min(seconds, client_timeout)
+    with request_deadline(seconds):
+        return await call_next(request)
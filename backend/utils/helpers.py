@@ -1,4 +1,24 @@
-def build_redis_key(data: dict):
-    data_list = [f"{key}:{value}" for key, value in data.items()]
-    data_str = "_".join(data_list)
-    return data_str
+import hashlib
+import json
+
+# Bump when the shape of cached values changes so old entries are ignored
+CACHE_KEY_VERSION = 1
+
+
+def canonical_json(data) -> str:
+    """Serialise ``data`` so equal payloads give equal strings, whatever the key order."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def build_request_hash(data) -> str:
+    return hashlib.sha256(canonical_json(data).encode()).hexdigest()
+
+
+def build_redis_key(namespace: str, data, version: int = CACHE_KEY_VERSION) -> str:
+    """
+    Build ``<namespace>:v<version>:<sha256>`` from the canonical form of ``data``.
+
+    Keys have a fixed length whatever the payload size, do not depend on field
+    order and never collide across namespaces.
+    """
+    return f"{namespace}:v{version}:{build_request_hash(data)}"
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable
+
+
+def _metric_name(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    label_str = ",".join(f"{key}={value}" for key, value in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics store: counters, gauges and timings.
+
+    Values are per worker process and exposed as JSON on ``GET /metrics``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._gauge_callbacks: dict[str, Callable[[], float]] = {}
+        self._timings: dict[str, dict] = {}
+
+    def incr(self, name: str, value: float = 1, /, **labels):
+        with self._lock:
+            self._counters[_metric_name(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, /, **labels):
+        with self._lock:
+            self._gauges[_metric_name(name, labels)] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float], /, **labels):
+        """Register a gauge whose value is read when a snapshot is taken."""
+        with self._lock:
+            self._gauge_callbacks[_metric_name(name, labels)] = callback
+
+    def observe(self, name: str, seconds: float, /, **labels):
+        with self._lock:
+            timing = self._timings.setdefault(
+                _metric_name(name, labels), {"count": 0, "sum": 0.0, "max": 0.0}
+            )
+            timing["count"] += 1
+            timing["sum"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    @contextmanager
+    def timer(self, name: str, /, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter(self, name: str, /, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_metric_name(name, labels), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            gauges = dict(self._gauges)
+            callbacks = dict(self._gauge_callbacks)
+            counters = dict(self._counters)
+            timings = {
+                name: {
+                    **timing,
+                    "avg": timing["sum"] / timing["count"] if timing["count"] else 0,
+                }
+                for name, timing in self._timings.items()
+            }
+
+        for name, callback in callbacks.items():
+            try:
+                gauges[name] = callback()
+            except Exception:
+                continue
+
+        return {"counters": counters, "gauges": gauges, "timings": timings}
+
+
+metrics = MetricsRegistry()
@@ -2,13 +2,22 @@ from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 import jwt
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.users import UserInDB
 import os
 from fastapi import Depends, HTTPException, status
 from jwt.exceptions import InvalidTokenError
-from crud.database import get_session
+from crud.database import async_engine, get_read_session
+from external_services.cache import async_redis_cache
+from utils.helpers import build_redis_key
+from utils.metrics import metrics
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import hmac
 import secrets
+import uuid
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -18,29 +27,103 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
+# Users resolved from access tokens are cached this long (in-process and Redis)
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))
+# How long a token version bump is remembered: older tokens are refused without
+# a database read and the user is read from the primary, not a lagging replica
+USER_VERSION_FLOOR_TTL = int(
+    os.getenv("USER_VERSION_FLOOR_TTL", ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+)
+
+# bcrypt releases the GIL, so a thread pool runs hashes in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+# Hashes running or queued per worker process before new ones get a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so a login never blocks the event
+    loop. Once ``max_pending`` hashes are running or queued, further ones are
+    refused with a 503 straight away instead of piling up behind them.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self.max_pending = max_pending
+        # Only touched from the event loop thread
+        self.pending = 0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            metrics.incr("password_hash_rejected_total")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            with metrics.timer("password_hash_seconds"):
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, fn, *args
+                )
+        finally:
+            self.pending -= 1
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+metrics.register_gauge("password_hash_pending", lambda: password_hasher.pending)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(
+        pwd_context.verify, plain_password, hashed_password
+    )
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# Reset tokens are "<selector>.<verifier>": the selector is stored as is and
+# indexed, only a SHA-256 of the verifier is stored
+RESET_TOKEN_SEPARATOR = "."
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def generate_reset_token() -> tuple[str, str]:
+    """Generate a cryptographically secure (selector, verifier) pair."""
+    return secrets.token_urlsafe(12), secrets.token_urlsafe(32)
 
 
-def generate_reset_token() -> str:
-    """Generate a cryptographically secure random token for password reset."""
-    return secrets.token_urlsafe(32)
+def format_reset_token(selector: str, verifier: str) -> str:
+    return f"{selector}{RESET_TOKEN_SEPARATOR}{verifier}"
 
 
-def hash_reset_token(token: str) -> str:
-    """Hash the reset token before storing in database."""
-    return pwd_context.hash(token)
+def split_reset_token(token: str) -> tuple[str, str] | None:
+    """Return (selector, verifier), or None for tokens issued before selectors."""
+    selector, separator, verifier = token.partition(RESET_TOKEN_SEPARATOR)
+    if not separator or not selector or not verifier:
+        return None
+    return selector, verifier
 
 
-def verify_reset_token(plain_token: str, hashed_token: str) -> bool:
-    """Verify a reset token against its hash."""
-    return pwd_context.verify(plain_token, hashed_token)
+def hash_reset_token(verifier: str) -> str:
+    """Hash the reset token verifier before storing it in the database."""
+    return hashlib.sha256(verifier.encode()).hexdigest()
+
+
+def verify_reset_token(verifier: str, hashed_verifier: str) -> bool:
+    """Constant-time check of a reset token verifier against its stored hash."""
+    return hmac.compare_digest(hash_reset_token(verifier), hashed_verifier)
+
+
+async def verify_legacy_reset_token(plain_token: str, hashed_token: str) -> bool:
+    """Check a token issued before selectors, stored as a bcrypt hash."""
+    return await verify_password(plain_token, hashed_token)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -57,16 +140,92 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-def authenticate_user(session: Session, email: str, password: str):
-    user = session.exec(select(UserInDB).where(UserInDB.email == email)).first()
+async def authenticate_user(session: AsyncSession, email: str, password: str):
+    user = (await session.exec(select(UserInDB).where(UserInDB.email == email))).first()
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await verify_password(password, user.password):
         return False
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), session=Depends(get_session)):
+def access_token_claims(user: UserInDB) -> dict:
+    """Claims identifying ``user`` in an access token."""
+    return {"sub": user.email, "uid": str(user.id), "ver": user.token_version}
+
+
+def _user_cache_key(user_id: uuid.UUID | str) -> str:
+    return build_redis_key("user", {"id": str(user_id)})
+
+
+def _user_version_floor_key(user_id: uuid.UUID | str) -> str:
+    return f"user-version:{user_id}"
+
+
+async def invalidate_cached_user(user: UserInDB):
+    """
+    Call after committing a ``token_version`` bump. Records the new version
+    as a floor before dropping the cached user, so an entry re-cached from a
+    lagging replica in between is not served either.
+    """
+    await async_redis_cache.set(
+        _user_version_floor_key(user.id), user.token_version, USER_VERSION_FLOOR_TTL
+    )
+    await async_redis_cache.delete(_user_cache_key(user.id))
+
+
+async def _load_user(session: AsyncSession, payload: dict) -> UserInDB | None:
+    """
+    Resolve the token's user, from the user cache when possible.
+
+    Cached users are detached and carry no password or reset token, only
+    what request handlers need. A token whose version is behind the user's
+    has been revoked. After a recent version bump the user is read from the
+    primary, ``session`` may be on a replica that has not seen it yet.
+    """
+    user_id, version = payload.get("uid"), payload.get("ver")
+    if user_id is None or version is None:
+        # Issued before tokens carried the user id
+        email = payload.get("sub")
+        if email is None:
+            return None
+        return (
+            await session.exec(select(UserInDB).where(UserInDB.email == email))
+        ).first()
+
+    key = _user_cache_key(user_id)
+    cached, floor = await async_redis_cache.mget(
+        [key, _user_version_floor_key(user_id)]
+    )
+    if floor is not None and version < floor:
+        return None
+    if cached is not None and cached["token_version"] == version:
+        metrics.incr("auth_user_cache_total", result="hit")
+        return UserInDB(
+            id=uuid.UUID(cached["id"]),
+            email=cached["email"],
+            token_version=cached["token_version"],
+        )
+
+    metrics.incr("auth_user_cache_total", result="miss")
+    if floor is not None:
+        async with AsyncSession(async_engine) as primary:
+            user = await primary.get(UserInDB, uuid.UUID(user_id))
+    else:
+        user = await session.get(UserInDB, uuid.UUID(user_id))
+    if user is None or user.token_version != version:
+        return None
+    await async_redis_cache.set(
+        key,
+        {"id": str(user.id), "email": user.email, "token_version": user.token_version},
+        USER_CACHE_TTL,
+    )
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), session=Depends(get_read_session)
+):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -74,12 +233,9 @@ def get_current_user(token: str = Depends(oauth2_scheme), session=Depends(get_se
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        user = session.exec(select(UserInDB).where(UserInDB.email == email)).first()
+        user = await _load_user(session, payload)
         if user is None:
             raise credentials_exception
-    except InvalidTokenError:
+    except (InvalidTokenError, ValueError):
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
@@ -30,11 +30,64 @@ export default function MyBookingsAndTicketsPage() {
   const [error, setError] = useState<string | null>(null);
   const [page, setPage] = useState(1);
   const [search, setSearch] = useState("");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   const PAGE_SIZE = 10;
 
+  const fetchBookings = async (cursor: string | null) => {
+    const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await fetch(`${baseUrl}/bookings${query}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`,
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`Failed to fetch bookings: ${response.status}`);
+    }
+
+    const data = await response.json();
+
+    // Transform API response to Booking format, skipping orders the
+    // backend could not retrieve (returned as { id, error })
+    const transformedBookings: Booking[] = data.filter((order: any) => !order.error).map((order: any) => {
+      const flightOffer = order.flightOffers[0];
+      const itinerary = flightOffer.itineraries[0];
+      const firstSegment = itinerary.segments[0];
+      const lastSegment = itinerary.segments[itinerary.segments.length - 1];
+
+      const reference = order.associatedRecords[0]?.reference || 'N/A';
+      const creationDate = order.associatedRecords[1]?.creationDate || null;
+
+      return {
+        id: order.id,
+        bookingId: reference,
+        pnr: reference,
+        status: firstSegment.bookingStatus,
+        ticketStatus: firstSegment.bookingStatus === 'CONFIRMED' ? 'ready' : 'processing',
+        origin: firstSegment.departure.iataCode,
+        destination: lastSegment.arrival.iataCode,
+        departureDate: firstSegment.departure.at.split('T')[0],
+        returnDate: itinerary.segments.length > 1 ? lastSegment.arrival.at.split('T')[0] : null,
+        airline: flightOffer.validatingAirlineCodes[0],
+        flightNumber: `${firstSegment.carrierCode}${firstSegment.number}`,
+        passengers: order.travelers.length,
+        total: flightOffer.price.total,
+        currency: flightOffer.price.currency,
+        ticketUrl: firstSegment.bookingStatus === 'CONFIRMED' ? `/tickets/${reference}.pdf` : null,
+        issuedAt: creationDate ? creationDate.split('T')[0] : null,
+        passengerNames: order.travelers.map((t: any) => `${t.name.firstName} ${t.name.lastName}`),
+      };
+    });
+
+    // The API pages bookings; the header holds the cursor of the next page
+    return { bookings: transformedBookings, nextCursor: response.headers.get('X-Next-Cursor') };
+  };
+
   useEffect(() => {
-    const fetchBookings = async () => {
+    const loadFirstPage = async () => {
       if (!token) {
         setError("No authentication token found");
         setLoading(false);
@@ -42,51 +95,9 @@ export default function MyBookingsAndTicketsPage() {
       }
 
       try {
-        const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
-        const response = await fetch(`${baseUrl}/bookings`, {
-          headers: {
-            'Authorization': `Bearer ${token}`,
-          },
-        });
-
-        if (!response.ok) {
-          throw new Error(`Failed to fetch bookings: ${response.status}`);
-        }
-
-        const data = await response.json();
-
-        // Transform API response to Booking format
-        const transformedBookings: Booking[] = data.map((order: any) => {
-          const flightOffer = order.flightOffers[0];
-          const itinerary = flightOffer.itineraries[0];
-          const firstSegment = itinerary.segments[0];
-          const lastSegment = itinerary.segments[itinerary.segments.length - 1];
-
-          const reference = order.associatedRecords[0]?.reference || 'N/A';
-          const creationDate = order.associatedRecords[1]?.creationDate || null;
-
-          return {
-            id: order.id,
-            bookingId: reference,
-            pnr: reference,
-            status: firstSegment.bookingStatus,
-            ticketStatus: firstSegment.bookingStatus === 'CONFIRMED' ? 'ready' : 'processing',
-            origin: firstSegment.departure.iataCode,
-            destination: lastSegment.arrival.iataCode,
-            departureDate: firstSegment.departure.at.split('T')[0],
-            returnDate: itinerary.segments.length > 1 ? lastSegment.arrival.at.split('T')[0] : null,
-            airline: flightOffer.validatingAirlineCodes[0],
-            flightNumber: `${firstSegment.carrierCode}${firstSegment.number}`,
-            passengers: order.travelers.length,
-            total: flightOffer.price.total,
-            currency: flightOffer.price.currency,
-            ticketUrl: firstSegment.bookingStatus === 'CONFIRMED' ? `/tickets/${reference}.pdf` : null,
-            issuedAt: creationDate ? creationDate.split('T')[0] : null,
-            passengerNames: order.travelers.map((t: any) => `${t.name.firstName} ${t.name.lastName}`),
-          };
-        });
-
-        setBookings(transformedBookings);
+        const result = await fetchBookings(null);
+        setBookings(result.bookings);
+        setNextCursor(result.nextCursor);
       } catch (err) {
         console.error('Error fetching bookings:', err);
         setError(err instanceof Error ? err.message : 'Failed to load bookings');
@@ -95,9 +106,24 @@ export default function MyBookingsAndTicketsPage() {
       }
     };
 
-    fetchBookings();
+    loadFirstPage();
   }, [token]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const result = await fetchBookings(nextCursor);
+      setBookings(prev => [...prev, ...result.bookings]);
+      setNextCursor(result.nextCursor);
+    } catch (err) {
+      console.error('Error fetching bookings:', err);
+      setError(err instanceof Error ? err.message : 'Failed to load bookings');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusColor = (status: string) => {
     switch (status) {
       case "CONFIRMED":
@@ -276,6 +302,18 @@ export default function MyBookingsAndTicketsPage() {
                 </div>
               </div>
             )}
+            {/* Shown whenever the API has more pages, even if none of the loaded bookings match */}
+            {nextCursor && (
+              <div className="mt-6 text-center">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="bg-blue-600 text-white px-6 py-2 rounded-lg hover:bg-blue-700 transition-colors font-medium disabled:opacity-50 disabled:cursor-not-allowed"
+                >
+                  {loadingMore ? "Loading..." : "Load more bookings"}
+                </button>
+              </div>
+            )}
           </>
         )}
       </div>